@@ -1,13 +1,13 @@
 import streamlit as st
 import os
-import glob
 import re
-import gc
-import io
-import requests
 import pandas as pd
 from datetime import datetime
-import time
+from corpus_manager import CorpusManager
+from master_db import MasterSource
+from result_export import EXPORT_FORMATS, export_file
+from ranking import TOP_K, cross_keyword_view, top_k
+from search_engine import MAX_HITS, SearchEngine, SearchJob
 
 # --- 1. CONFIGURATION & STYLES ---
 st.set_page_config(page_title="Coulter Recruiting v1.26", page_icon="🏈", layout="wide")
@@ -54,358 +54,45 @@ st.markdown("""
     </div>
     """, unsafe_allow_html=True)
 
-# --- 2. CONSTANTS & FILES ---
-GOOGLE_SHEET_CSV_URL = "https://docs.google.com/spreadsheets/d/18kLsLZVPYehzEjlkZMTn0NP0PitRonCKXyjGCRjLmms/export?format=csv&gid=1572560106"
+# --- 2. DATA LOADING ---
+@st.cache_resource(show_spinner=False)
+def get_engine_v1_27():
+    """ONE read-only engine per process (master DB + corpus snapshots), shared by every session."""
+    return SearchEngine(MasterSource().start(), CorpusManager().start())
 
-# STRICT LISTS
-FOOTBALL_INDICATORS = ["football", "quarterback", "linebacker", "touchdown", "nfl", "bowl", "recruiting", "fbs", "fcs", "interception", "tackle", "gridiron"]
-
-# V1.19: Expanded Non-Football List
-NON_FOOTBALL_INDICATORS = {
-    "Volleyball": ["volleyball", "set", "spike", "libero"], 
-    "Baseball": ["baseball", "inning", "homerun", "pitcher", "dugout"],
-    "Basketball": ["basketball", "nba", "dunk", "rebound", "hoop"], 
-    "Soccer": ["soccer", "goal", "striker", "fifa"],
-    "Softball": ["softball"], 
-    "Track": ["track", "sprint", "marathon"], 
-    "Swimming": ["swim", "dive", "pool", "breaststroke"], 
-    "Lacrosse": ["lacrosse", "stick"],
-    "Equestrian": ["equestrian", "horse", "rider", "hunt seat"], 
-    "Rowing": ["rowing", "crew", "coxswain", "regatta"],
-    "Field Hockey": ["field hockey"], 
-    "Water Polo": ["water polo"],
-    "Fencing": ["fencing", "foil", "saber", "epee"],
-    "Pistol": ["pistol", "shooting", "rifle", "smallbore"],
-    "Gymnastics": ["gymnastics", "vault", "beam"],
-    "Skiing": ["skiing", "slalom", "nordic", "alpine"],
-    "Bowling": ["bowling", "kegler"],
-    "Wrestling": ["wrestling", "grapple", "mat"] 
-}
-
-# V1.26: BANNED SCHOOL NAMES (Junk Headers)
-BANNED_SCHOOL_NAMES = [
-    "official site", "official website", "copyright", "powered by", "terms of service",
-    "privacy policy", "accessibility", "sidearm sports", "ad blocker", "main navigation",
-    "skip to main", "pause all rotators", "composite calendar", "related videos",
-    "ticket office", "student-athlete", "staff directory"
-]
-
-POISON_PILLS_TEXT = ["Women's Flag", "Flag Football"]
-BAD_NAMES = [
-    "Football Roster", "Football Schedule", "Composite Schedule", "Game Recap", 
-    "Menu", "Search", "Tickets", "Clemson Tiger Football", "University Athletics",
-    "National Champions", "Athletics Website", "Skip To Main Content", 
-    "Pause All Rotators", "Scoreboard", "Main Baseball", "Main Basketball",
-    "Story Links", "Related Videos", "Related News", "Composite Calendar",
-    "Official Site", "Official Website", "Copyright", "Terms of Service"
-]
-
-SCHOOL_ALIASES = {
-    "ASU": "Arizona State", "UCF": "Central Florida", "Ole Miss": "Mississippi", 
-    "FSU": "Florida State", "Miami": "Miami (FL)", "UConn": "Connecticut",
-    "LSU": "Louisiana State", "USC": "Southern California", "SMU": "Southern Methodist",
-    "TCU": "Texas Christian", "BYU": "Brigham Young", "FAU": "Florida Atlantic",
-    "FIU": "Florida International", "USF": "South Florida", "UNC": "North Carolina",
-    "NC State": "North Carolina State", "UVA": "Virginia", "VT": "Virginia Tech",
-    "GT": "Georgia Tech", "Pitt": "Pittsburgh", "Wash St": "Washington State",
-    "Miss St": "Mississippi State", "Okla St": "Oklahoma State", "Mich St": "Michigan State",
-    "Ohio State University": "Ohio State",
-    "The Ohio State University": "Ohio State"
-}
-
-# --- 3. HELPER FUNCTIONS ---
-def normalize_text_v1_26(text):
-    if pd.isna(text): return ""
-    text = str(text).lower()
-    text = text.replace('.', '').replace("'", "").strip()
-    # Explicitly remove 'athletics'
-    for word in ['university', 'univ', 'college', 'the', 'of', 'athletics', 'inst']:
-        text = text.replace(word, '')
-    return re.sub(r'[^a-z0-9]', '', text).strip()
-
-@st.cache_data(show_spinner=False)
-def load_lookup_v1_26():
-    """Load coach database with TEAM PHOBIC COLUMN DETECTION."""
-    df = None
-    try:
-        r = requests.get(GOOGLE_SHEET_CSV_URL, timeout=3)
-        if r.ok:
-            df = pd.read_csv(io.BytesIO(r.content), encoding='utf-8')
-    except: pass
-    
-    if df is None or df.empty:
-        possible_files = glob.glob("*master*.csv") + glob.glob("*MASTER*.csv")
-        if possible_files:
-            try: df = pd.read_csv(possible_files[0], encoding='utf-8')
-            except: 
-                try: df = pd.read_csv(possible_files[0], encoding='latin1')
-                except: pass
-
-    if df is None or df.empty: return {}, {}, {}, "Failed"
-
-    # --- SMART COLUMN FINDER ---
-    def get_smart_col(keywords, data_type='text', bad_words=None):
-        if bad_words is None: bad_words = []
-        candidates = []
-        for col in df.columns:
-            c_lower = str(col).lower().strip()
-            if any(k in c_lower for k in keywords):
-                candidates.append(col)
-        
-        if not candidates: return None
-        
-        best_col = None
-        max_score = -9999
-        
-        for col in candidates:
-            score = 0
-            col_lower = str(col).lower()
-            if any(bad in col_lower for bad in ['sent', 'verify', 'check', 'status', 'date', 'time']): score -= 100
-            if any(bad in col_lower for bad in bad_words): score -= 100
-            if "individual" in col_lower or "personal" in col_lower or "coach" in col_lower: score += 50
-            if col_lower in keywords: score += 10
-            
-            sample = df[col].dropna().astype(str).head(100).tolist()
-            if not sample: score -= 10
-            else:
-                valid_count = 0
-                for val in sample:
-                    v = val.strip().lower()
-                    if v in ['x', 'y', 'n', 'yes', 'no', 'true', 'false', 'done']: valid_count -= 1 
-                    elif data_type == 'email' and '@' in v: valid_count += 2
-                    elif data_type == 'twitter' and len(v) > 2: valid_count += 1
-                score += valid_count
-            
-            if score > max_score:
-                max_score = score
-                best_col = col
-                
-        return best_col
-
-    c_school = get_smart_col(['school', 'institution'])
-    c_first = get_smart_col(['first name', 'first'])
-    c_last = get_smart_col(['last name', 'last'])
-    c_email = get_smart_col(['email', 'e-mail', 'mail'], 'email')
-    c_twitter = get_smart_col(["individual's twitter", "twitter", "x.com", "social"], 'twitter', bad_words=['team', 'general', 'program', 'athletics'])
-    c_title = get_smart_col(['title', 'position', 'role'])
-
-    lookup, global_name_lookup, lastname_lookup = {}, {}, {}
-
-    for _, row in df.iterrows():
-        raw_school = str(row[c_school]).strip() if c_school and pd.notna(row[c_school]) else ""
-        for alias, real in SCHOOL_ALIASES.items():
-            if alias.lower() == raw_school.lower(): raw_school = real
-        
-        # --- HANDLE SPLIT OR SINGLE COLUMNS ---
-        first = str(row[c_first]).strip() if c_first and pd.notna(row[c_first]) else ""
-        last = str(row[c_last]).strip() if c_last and pd.notna(row[c_last]) else ""
-        
-        full_name = ""
-        if first and last: full_name = f"{first} {last}".strip()
-        elif first: full_name = first
-        elif last: full_name = last
-            
-        if full_name:
-            email = str(row[c_email]).strip() if c_email and pd.notna(row[c_email]) else ""
-            twitter = str(row[c_twitter]).strip() if c_twitter and pd.notna(row[c_twitter]) else ""
-            title = str(row[c_title]).strip() if c_title and pd.notna(row[c_title]) else ""
-            
-            # Clean junk data
-            if email.lower() in ['x', 'y', 'yes', 'no', '-']: email = ""
-            if twitter.lower() in ['x', 'y', 'yes', 'no', '-']: twitter = ""
-
-            rec = {'email': email, 'twitter': twitter, 'title': title, 'school': raw_school, 'name': full_name}
-            
-            s_key = normalize_text_v1_26(raw_school)
-            n_key = normalize_text_v1_26(full_name)
-            l_key = normalize_text_v1_26(last)
-            
-            if s_key: lookup[(s_key, n_key)] = rec
-            if n_key not in global_name_lookup: global_name_lookup[n_key] = rec
-            if len(l_key) > 3:
-                if (s_key, l_key) not in lastname_lookup: lastname_lookup[(s_key, l_key)] = []
-                lastname_lookup[(s_key, l_key)].append(rec)
-            
-    return lookup, global_name_lookup, lastname_lookup, "Success"
-
-# *** V1.26: Cache Clear ***
-if "master_data_v1_26" not in st.session_state:
+# *** V1.27: Cache Clear ***
+if "engine_ready_v1_27" not in st.session_state:
     with st.status("Initializing Recruiting Engine...", expanded=True) as status:
         st.write("📂 Connecting to Master Database...")
-        data_tuple = load_lookup_v1_26()
+        get_engine_v1_27()
         st.write("✅ Database Loaded!")
-        st.session_state["master_data_v1_26"] = data_tuple
+        st.session_state["engine_ready_v1_27"] = True
         status.update(label="System Ready!", state="complete", expanded=False)
 
-master_lookup, global_name_lookup, lastname_lookup, db_status = st.session_state["master_data_v1_26"]
-
-def detect_sport(bio):
-    text = str(bio).lower()
-    if any(p.lower() in text[:1000] for p in POISON_PILLS_TEXT): return None
-    
-    # Check for Non-Football Sports
-    fb_score = sum(text.count(w) for w in FOOTBALL_INDICATORS)
-    for sport, keywords in NON_FOOTBALL_INDICATORS.items():
-        # Strict check for other sports
-        sport_score = sum(text.count(w) for w in keywords)
-        if sport_score > fb_score + 1: return None
-        
-    return "Football"
-
-def clean_player_title(title, bio_text):
-    t_clean = str(title).strip().lower()
-    if "assistant" in t_clean or "coach" in t_clean or "manager" in t_clean: return title
-    return "Football"
+engine = get_engine_v1_27()
+# Re-read every run: a background refresh swaps in new data between searches
+db_status = engine.master.status
 
-def determine_role_v1_26(title, bio_text):
-    title_lower = str(title).lower()
-    if "coach" in title_lower: return "COACH/STAFF"
-
-    # V1.26: Expanded Staff List (Medical, Ops, Academics)
-    strong_staff = [
-        "coordinator", "director", "manager", "analyst", "assistant", "specialist", 
-        "trainer", "video", "recruiting", "personnel", "chief", "scout", 
-        "dietitian", "nutrition", "ga", "grad assistant", "intern", "fellow", 
-        "admin", "strength", "conditioning", "performance", "player dev", 
-        "exec", "head", "gm", "ops", "medicine", "doctor", "dr.", "physician", "academic"
-    ]
-    if any(k in title_lower for k in strong_staff): return "COACH/STAFF"
-
-    strong_player = ["quarterback", "running back", "wide receiver", "tight end", "offensive line", "defensive line", "linebacker", "defensive back", "cornerback", "safety", "kicker", "punter", "snapper", "qb", "rb", "wr", "te", "ol", "dl", "lb", "db", "cb", "s", "k", "p", "ls", "athlete", "edge", "rush", "tackle", "guard", "center"]
-    if any(p in title_lower for p in strong_player): return "PLAYER"
-    
-    bio_sample = str(bio_text)[:800].lower()
-    if any(f in bio_sample for f in ["class:", "height:", "weight:", "hometown:", "lbs"]): return "PLAYER"
-    return "PLAYER"
-
-def parse_header_v1_26(bio):
-    lines = [L.strip() for L in str(bio).split('\n') if L.strip()][:15]
-    header = None
-    for delimiter in [" - ", " | ", " : "]:
-        header = next((L for L in lines if delimiter in L and "http" not in L), None)
-        if header: break
-        
-    extracted = {'Name': None, 'Title': "Unknown", 'School': "Unknown", 'Role': 'PLAYER', 'Last': ''}
-    
-    if header:
-        parts = re.split(r' - | \| | : ', header)
-        if len(parts) >= 2:
-            extracted['Name'] = parts[0].strip()
-            extracted['Last'] = parts[0].strip().split(' ')[-1]
-            extracted['School'] = parts[-1].strip()
-            if len(parts) > 2: extracted['Title'] = parts[1].strip()
-            
-    # --- V1.22: ADVANCED JUNK ROW DETECTION ---
-    name_check = extracted['Name'].lower() if extracted['Name'] else ""
-    title_check = extracted['Title'].lower() if extracted['Title'] else ""
-    school_check = extracted['School'].lower() if extracted['School'] else ""
-
-    # 1. Kill bullet points and verbs
-    if any(x in name_check for x in ["•", "*", "caught", "played", "appeared", "recorded", "started"]): return None
-    
-    # 2. Kill sport names in the NAME column
-    for sport in NON_FOOTBALL_INDICATORS:
-        if sport.lower() in name_check: return None
-
-    # 3. Kill "Official Site" in School/Name
-    for ban in BANNED_SCHOOL_NAMES:
-        if ban in school_check or ban in name_check: return None
-
-    # 4. Kill overly long "names" (paragraphs)
-    if len(name_check) > 40: return None
-    
-    # 5. Kill school names masquerading as people
-    if ("university" in name_check or "college" in name_check) and \
-       ("unknown" in title_check or "athletics" in title_check):
-        return None 
-    
-    if "University" in extracted['Title'] or "Athletics" in extracted['Title'] or extracted['Title'] == "Unknown":
-        match = re.search(r'(?:Title|Position)[:\s]+([A-Za-z \-\&]+?)(?=\n|Email|Phone|Bio)', str(bio), re.IGNORECASE)
-        if match: extracted['Title'] = match.group(1).strip()
-
-    # --- v1.23: CLEAN SCHOOL NAME (REMOVE 'ATHLETICS' AND 'FOOTBALL') ---
-    if extracted['School']:
-        extracted['School'] = extracted['School'].replace("Athletics", "").strip()
-        if extracted['School'].endswith(" Football"):
-             extracted['School'] = extracted['School'].replace(" Football", "").strip()
-        # V1.26: BANNED SCHOOL FIX (Set to Unknown if generic)
-        if any(b in extracted['School'].lower() for b in BANNED_SCHOOL_NAMES):
-            extracted['School'] = "Unknown"
-
-    for alias, real in SCHOOL_ALIASES.items():
-        if alias.lower() in extracted['School'].lower(): extracted['School'] = real
-        
-    extracted['Role'] = determine_role_v1_26(extracted['Title'], bio)
-    
-    # --- V1.8: FORCE FOOTBALL TITLE FOR PLAYERS ---
-    if extracted['Role'] == 'PLAYER':
-        extracted['Title'] = "Football"
-        
-    return extracted
-
-def get_smart_snippet(text, keyword):
-    """V1.25: CONTEXT SNIPER (Regex Word Boundary)."""
-    clean_text = str(text).replace(chr(10), ' ').replace(chr(13), ' ')
-    
-    # 1. Look for STRICT Word Matches (Prevent 'JaylenColumbus')
-    matches = list(re.finditer(rf"\b{re.escape(keyword)}\b", clean_text, re.IGNORECASE))
-    
-    if not matches:
-        matches = list(re.finditer(re.escape(keyword), clean_text, re.IGNORECASE))
-        if not matches:
-            return "" 
-    
-    best_snippet = None
-    max_score = -999
-    priority_words = ["hometown", "native", "high school", "born", "raised", "from", "attended", "product of"]
-    
-    valid_snippet_found = False
-
-    for m in matches:
-        start = max(0, m.start() - 60)
-        end = min(len(clean_text), m.end() + 60)
-        snippet = clean_text[start:end]
-        
-        score = 0
-        snippet_lower = snippet.lower()
-        
-        # Boost for hometown context
-        for p in priority_words:
-            if p in snippet_lower: score += 10
-        
-        # V1.22: Penalize generic lists
-        if "roster" in snippet_lower or "schedule" in snippet_lower or "statistics" in snippet_lower:
-            score -= 15
-            
-        # V1.23: ROSTER DUMP DETECTOR
-        if snippet.count(',') > 3:
-            score -= 50 
-        else:
-            valid_snippet_found = True # Found a non-list match
-            
-        # V1.22: Penalize very short snippets
-        if len(snippet) < 30: score -= 5
-        
-        if score > max_score:
-            max_score = score
-            best_snippet = f"...{snippet}..."
-    
-    # V1.24: FALLBACK LOGIC
-    if not valid_snippet_found:
-        return f"⚠️ {best_snippet}" 
-            
-    return best_snippet
+# Results keep (Chunk, Row) bio references - never shown; Relevance only in the ranked view
+HIDDEN_COLUMNS = {"Chunk": None, "Row": None, "Relevance": None}
+RANKED_HIDDEN_COLUMNS = {"Chunk": None, "Row": None}
+# Live preview renders at most this many rows per refresh
+PREVIEW_ROWS = 500
 
 # --- 4. SEARCH LOGIC ---
 st.markdown('<p class="instruction-text">Type in keywords to search college football webpage bios.<br>Put a comma between keywords for multiple searches (e.g., "Tallahassee, San Antonio").</p>', unsafe_allow_html=True)
 
 if db_status == "Failed":
     st.error("❌ Master Database Not Found. Contact info will be empty.")
+elif db_status == "Pending":
+    st.info("⏳ Master Database is still downloading. Contact info will appear on your next search.")
 
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
     with st.form(key='search_form'):
         keywords_str = st.text_input("", placeholder="🔍 Enter keywords...")
+        max_hits = st.number_input("Max matches per keyword (0 = all)", min_value=0, value=MAX_HITS, step=100)
+        fuzzy = st.checkbox("Fuzzy match (typos, abbreviations, synonyms)")
         submit_button = st.form_submit_button(label='Search')
 
 if 'search_results' not in st.session_state:
@@ -418,107 +105,51 @@ if submit_button and keywords_str:
     keywords_list = [k.strip() for k in keywords_str.split(',') if k.strip()]
     st.session_state['last_keywords'] = keywords_str
     
-    chunk_files = glob.glob("chunk_*.csv")
-    chunk_files.sort()
-    
-    all_results = {} # Store DF for each keyword
-    
-    if not chunk_files:
+    # V1.27: the corpus manager's current snapshot - new chunks appear here once indexed
+    if not engine.snapshot().chunk_files:
         st.error("❌ No database files found on server.")
     else:
-        progress_bar = st.progress(0)
-        
-        # Run search for EACH keyword separately
-        for k_idx, kw in enumerate(keywords_list):
-            results_found = []
-            pattern = re.escape(kw) # Search JUST this keyword
-            
-            for i, file in enumerate(chunk_files):
-                try:
-                    df_chunk = pd.read_csv(file, usecols=['Full_Bio'], dtype=str, on_bad_lines='skip').fillna("")
-                    mask = df_chunk['Full_Bio'].str.contains(pattern, case=False, na=False, regex=True)
-                    
-                    if mask.any():
-                        matches = df_chunk[mask].copy()
-                        for idx, row in matches.iterrows():
-                            meta = parse_header_v1_26(row['Full_Bio'])
-                            
-                            # --- V1.22: SKIP BAD ROWS ---
-                            if meta is None: continue
-
-                            name = meta['Name'] or "Unknown"
-                            
-                            if any(b.lower() in str(name).lower() for b in BAD_NAMES): continue
-                            if "football" in str(name).lower() or "athletics" in str(name).lower(): continue
-                            
-                            # --- V1.19: STRICT SPORT SANITATION ---
-                            school_check = str(meta['School']).lower()
-                            title_check = str(meta['Title']).lower()
-                            is_poisoned = False
-                            for sport in NON_FOOTBALL_INDICATORS:
-                                if sport.lower() in school_check or sport.lower() in title_check:
-                                    is_poisoned = True
-                                    break
-                            if is_poisoned: continue
-
-                            if detect_sport(row['Full_Bio']) != "Football": continue
-                            
-                            s_key = normalize_text_v1_26(meta['School'])
-                            n_key = normalize_text_v1_26(name)
-                            l_key = normalize_text_v1_26(meta['Last'])
-                            
-                            match = {}
-                            match_source = None
-                            
-                            # --- v1.13 MATCHING LOGIC ---
-                            if (s_key, n_key) in master_lookup:
-                                match = master_lookup[(s_key, n_key)]
-                                match_source = 'exact'
-                            elif n_key in global_name_lookup:
-                                match = global_name_lookup[n_key]
-                                match_source = 'global'
-                            elif (s_key, l_key) in lastname_lookup:
-                                match = lastname_lookup[(s_key, l_key)][0]
-                                match_source = 'fuzzy'
-
-                            # --- PLAYER PROTECTION PROTOCOL ---
-                            if match and match_source != 'exact':
-                                if meta['Role'] == 'PLAYER':
-                                    match = {} # Discard dangerous match
-                            
-                            # Apply Coach Data
-                            has_twitter = match.get('twitter') and len(str(match['twitter'])) > 3
-                            has_email = match.get('email') and len(str(match['email'])) > 3
-                            if has_twitter or has_email:
-                                meta['Role'] = 'COACH/STAFF'
-
-                            snippet = get_smart_snippet(row['Full_Bio'], kw)
-
-                            results_found.append({
-                                'Role': meta['Role'],
-                                'Name': name,
-                                'Title': match.get('title') or meta['Title'],
-                                'School': match.get('school') or meta['School'],
-                                'Email': match.get('email', ''),
-                                'Twitter': match.get('twitter', ''),
-                                'Context': snippet,
-                                'Full_Bio': row['Full_Bio']
-                            })
-                    del df_chunk
-                    gc.collect()
-                except Exception: continue
-                # Shared progress bar
-                progress_bar.progress((i + 1 + (k_idx * len(chunk_files))) / (len(chunk_files) * len(keywords_list)))
-
-            if results_found:
-                df_res = pd.DataFrame(results_found).drop_duplicates(subset=['Name', 'School'])
-                df_res['Full_Bio'] = df_res['Full_Bio'].astype(str).str.replace(r'[\r\n]+', ' ', regex=True)
-                df_res['Context'] = df_res['Context'].astype(str).str.replace(r'[\r\n]+', ' ', regex=True)
-                df_res.sort_values(by=['Role', 'School', 'Name'], ascending=[True, True, True], inplace=True)
-                all_results[kw] = df_res
-            
-        progress_bar.empty()
-        st.session_state['search_results'] = all_results
+        # V1.27: BACKGROUND SEARCH - a SINGLE PASS over the worker pool on its own thread
+        # (each chunk read ONCE for ALL keywords, cached keywords reuse their finished tab).
+        # The panel below polls it, so results appear as the first files finish.
+        previous = st.session_state.get('search_job')
+        if previous is not None: previous.cancel()
+        st.session_state['search_results'] = {}
+        st.session_state['search_cross'] = None
+        st.session_state['search_diagnostics'] = None
+        st.session_state['search_error'] = None
+        st.session_state['search_job'] = SearchJob(engine, keywords_list, max_hits=int(max_hits), fuzzy=fuzzy).start()
+
+# --- V1.27: LIVE SEARCH PANEL (reruns on its own until the job finishes) ---
+@st.fragment(run_every=0.5)
+def search_job_panel():
+    job = st.session_state.get('search_job')
+    if job is None: return
+    if job.finished:
+        del st.session_state['search_job']
+        if job.error:
+            st.session_state['search_error'] = job.error
+        else:
+            st.session_state['search_results'] = job.results
+            st.session_state['search_snapshot'] = job.snapshot  # keeps its files on disk for the export
+            st.session_state['search_cross'] = cross_keyword_view(job.results)
+            st.session_state['search_diagnostics'] = job.diagnostics.as_dict()
+        st.rerun()
+
+    st.progress(job.done / job.total if job.total else 0.0,
+                text=f"⏳ {'Cancelling' if job.cancelled else 'Searching'}... {job.done}/{job.total} files searched")
+    if st.button("✖ Cancel search", disabled=job.cancelled): job.cancel()
+    found = job.partial
+    if found:
+        total_found = sum(len(df) for df in found.values())
+        st.caption(f"{total_found} matches so far" + (f" (showing the first {PREVIEW_ROWS})" if total_found > PREVIEW_ROWS else ""))
+        preview = pd.concat([df.assign(Keyword=kw) for kw, df in found.items()]).head(PREVIEW_ROWS)
+        st.dataframe(preview, column_config=HIDDEN_COLUMNS, use_container_width=True, hide_index=True)
+
+if 'search_job' in st.session_state:
+    search_job_panel()
+if st.session_state.get('search_error'):
+    st.error(f"❌ Search failed: {st.session_state['search_error']}")
 
 if st.session_state['search_results']:
     results = st.session_state['search_results']
@@ -542,27 +173,60 @@ if st.session_state['search_results']:
     </div>
     """, unsafe_allow_html=True)
     
+    diag_info = st.session_state.get('search_diagnostics') or {}
+    if diag_info.get('cancelled'):
+        st.info("✖ Search cancelled - showing the matches found before it stopped.")
+    expanded = {kw: variants for kw, variants in diag_info.get('fuzzy', {}).items() if variants}
+    if expanded:
+        st.caption("Fuzzy match also searched: " + "; ".join(f"{kw} → {', '.join(v)}" for kw, v in expanded.items()))
+    if diag_info.get('capped'):
+        st.caption(f"Showing the first {diag_info['max_hits']} matches for: {', '.join(diag_info['capped'])}.")
+
+    # V1.27: RANKED VIEW - best matches per keyword (heap top-k) + people found under several keywords
+    ranked = st.toggle(f"⭐ Best matches first (top {TOP_K} per keyword)")
+    cross = st.session_state.get('search_cross')
+    show_cross = cross is not None and len(cross) > 0
+
     # Display Tabs
-    tabs = st.tabs(list(results.keys()))
+    tabs = st.tabs(list(results.keys()) + (["🔗 In several keywords"] if show_cross else []))
     for i, kw in enumerate(results.keys()):
         with tabs[i]:
-            st.dataframe(results[kw], column_config={"Full_Bio": None}, use_container_width=True, hide_index=True)
+            if ranked:
+                st.dataframe(top_k(results[kw]), column_config=RANKED_HIDDEN_COLUMNS, use_container_width=True, hide_index=True)
+            else:
+                st.dataframe(results[kw], column_config=HIDDEN_COLUMNS, use_container_width=True, hide_index=True)
+    if show_cross:
+        with tabs[-1]:
+            st.caption(f"{len(cross)} people matched more than one keyword - most keywords, then highest relevance first.")
+            st.dataframe(cross, column_config=RANKED_HIDDEN_COLUMNS, use_container_width=True, hide_index=True)
 
     # Clean Filename
     safe_kw = re.sub(r'[^a-zA-Z0-9]', '_', st.session_state['last_keywords'][:30])
-    file_name_dynamic = f"{safe_kw}_{datetime.now().date()}.xlsx"
-    
-    # Multi-Sheet Excel Writer
-    buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        for kw, df in results.items():
-            sheet_name = re.sub(r'[^a-zA-Z0-9 ]', '', kw)[:30]
-            df.to_excel(writer, index=False, sheet_name=sheet_name)
-            
-            worksheet = writer.sheets[sheet_name]
-            worksheet.set_column(0, 0, 15)
-            worksheet.set_column(1, 5, 25)
-            worksheet.set_column(6, 6, 50)
-            worksheet.set_column(7, 7, 50)
     
-    st.download_button("💾 DOWNLOAD EXCEL", buffer.getvalue(), file_name_dynamic, "application/vnd.ms-excel")
+    # V1.27: LAZY EXPORT - built only when DOWNLOAD is clicked, streamed to a temp file
+    export_fmt = st.radio("Export format", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], horizontal=True)
+    label, ext, mime = EXPORT_FORMATS[export_fmt]
+    file_name_dynamic = f"{safe_kw}_{datetime.now().date()}.{ext}"
+    st.download_button(f"💾 DOWNLOAD {label.split()[0].upper()}", lambda: export_file(results, export_fmt, engine.hydrate_bios),
+                       file_name_dynamic, mime)
+
+# --- V1.27: DIAGNOSTICS PANEL ---
+diag_info = st.session_state.get('search_diagnostics')
+if diag_info:
+    if diag_info['skipped']:
+        st.warning(f"⚠️ {len(diag_info['skipped'])} of {diag_info['chunks']} files could not be searched - see Diagnostics.")
+    with st.expander("🔧 Diagnostics (last search)"):
+        cached_note = f", {len(diag_info['cached'])} keywords from cache" if diag_info['cached'] else ""
+        snapshot = st.session_state.get('search_snapshot')
+        corpus_note = f" (corpus v{snapshot.version})" if snapshot is not None and snapshot.version else ""
+        st.caption(f"{diag_info['wall_seconds']:.2f}s wall clock, {diag_info['chunks']} files{corpus_note}{cached_note}. "
+                   "Stage times are summed over all workers.")
+        if diag_info['stage_seconds']:
+            st.dataframe(pd.DataFrame({'Stage': list(diag_info['stage_seconds']), 'Seconds': list(diag_info['stage_seconds'].values())}),
+                         hide_index=True)
+        rows = diag_info['rows']
+        st.write(f"Rows: {rows['rows_scanned']} scanned, {rows['rows_matched']} matched, "
+                 f"{rows['rows_matched'] - rows['rows_kept']} filtered (junk / non-football), {rows['rows_kept']} kept. "
+                 f"Files read from CSV: {rows['chunks_csv']}, not indexed: {rows['chunks_unindexed']}.")
+        if diag_info['skipped']:
+            st.dataframe(pd.DataFrame(diag_info['skipped']), hide_index=True)
@@ -0,0 +1,254 @@
+"""Headless benchmark + regression harness for the search pipeline.
+
+Runs the same pipeline as the app's Search button (search_chunk -> contact
+match -> merge/dedupe/sort -> export), serially and outside Streamlit, over a
+source chunk and synthetic corpora scaled up from it:
+
+    python benchmark.py                          # chunk_74.csv at 1x, 10x, 100x
+    python benchmark.py --warm --master master.csv --scales 1 10
+    python benchmark.py --save-snapshots bench_snapshots
+    python benchmark.py --check-snapshots bench_snapshots   # exit 1 on any change
+    python benchmark.py --check-cli --scales 10              # batch CLI, 2 worker processes
+
+A scale of N writes N copies of the source chunk as chunk_0001.csv ... into a
+scratch directory, so the corpus grows the way the real one does (more chunk
+files). Copy 1 is the source as is; later copies are different people (the
+parsed name gets a -N suffix, SOURCE URLs a /copy-N path), so result counts
+grow with the scale instead of deduplicating against copy 1. Cold runs read CSV and parse every match; --warm builds the corpus
+store and search index first (ingest time is reported, not counted).
+
+Per scale it reports seconds per stage, row counts, per-keyword result counts
+and peak memory (Python allocations via tracemalloc, measured in a separate
+run so tracing does not skew the timings, and the process max RSS).
+Snapshots are the hydrated result rows as JSON: a speedup must leave them
+byte-for-byte identical. --check-cli also runs `search_engine.py` as a script
+with two worker processes over each corpus and expects the same result counts.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import search_engine
+from bio_parser import bio_metadata
+from corpus_store import build_store, read_bios
+from diagnostics import COUNTERS, STAGES
+from master_db import MasterLookup, build_records
+from result_export import EXPORT_FORMATS, export_file
+from search_engine import StageStats, build_result_frames, enrich_hits, hydrate_bios, merge_chunk_rows, search_chunk
+from search_index import build_index
+
+SOURCE_RE = re.compile(r'^(\s*SOURCE:\s*)(\S+)', re.IGNORECASE)
+BENCH_KEYWORDS = ["Texas", "Florida", "Houston", "San Antonio", "Tallahassee", "high school", "coach", "a"]
+
+
+def vary_copy(df, names, copy):
+    """Copy N of the source chunk with every parsed person renamed 'Name-N' and SOURCE URLs moved to /copy-N."""
+    df = df.copy()
+    bios = []
+    for bio, name in zip(df['Full_Bio'], names):
+        bio = SOURCE_RE.sub(lambda m: f"{m.group(1)}{m.group(2).rstrip('/')}/copy-{copy}", bio, count=1)
+        bios.append(bio.replace(name, f"{name}-{copy}") if name else bio)
+    df['Full_Bio'] = bios
+    if 'Name' in df: df['Name'] = [f"{n}-{copy}" if name and n == name else n for n, name in zip(df['Name'], names)]
+    return df
+
+
+def make_corpus(source, scale, directory):
+    """`scale` copies of the source chunk as chunk_0001.csv, chunk_0002.csv, ... (see vary_copy)."""
+    os.makedirs(directory, exist_ok=True)
+    shutil.copyfile(source, os.path.join(directory, "chunk_0001.csv"))
+    if scale < 2: return directory
+    df = pd.read_csv(source, dtype=str, on_bad_lines='skip')
+    bios = read_bios(source)
+    names = [meta['Name'] if meta['Name'] != "Unknown" else None
+             for meta in (bio_metadata(bio, True) for bio in bios)]
+    for i in range(2, scale + 1):
+        vary_copy(df, names, i).to_csv(os.path.join(directory, f"chunk_{i:04d}.csv"), index=False)
+    return directory
+
+
+def load_master(path):
+    if not path: return MasterLookup.empty("Failed")
+    try: df = pd.read_csv(path, encoding='utf-8')
+    except UnicodeDecodeError: df = pd.read_csv(path, encoding='latin1')
+    return MasterLookup(build_records(df), "Success")
+
+
+def run_pipeline(keywords, master, export_fmt='xlsx'):
+    """One search over chunk_*.csv in the current directory -> (results, StageStats)."""
+    stats = StageStats()
+    chunk_rows = {}
+    for i, file in enumerate(sorted(glob.glob("chunk_*.csv"))):
+        hits = search_chunk(file, keywords, stats)
+        with stats.time('contact_match'):
+            chunk_rows[i] = enrich_hits(file, hits, master, keywords)
+    with stats.time('dedupe_sort'):
+        results = build_result_frames(merge_chunk_rows(chunk_rows, keywords))
+    if export_fmt:
+        with stats.time('export'):
+            export_file(results, export_fmt, hydrate_bios)
+    return results, stats
+
+
+def snapshot(results):
+    """Canonical, JSON-ready form of a result set (bio text included)."""
+    return {kw: hydrate_bios(df).fillna("").astype(str).to_dict('records') for kw, df in results.items()}
+
+
+def bench_scale(args, scale, master, workdir):
+    directory = make_corpus(args.source, scale, os.path.join(workdir, f"scale-{scale}"))
+    cwd = os.getcwd()
+    os.chdir(directory)
+    search_engine.reset_readers()
+    try:
+        report = {'scale': scale, 'chunks': scale, 'mode': 'warm' if args.warm else 'cold'}
+        if args.warm:
+            start = time.perf_counter()
+            build_store(log=lambda *a: None)
+            build_index(log=lambda *a: None)
+            report['ingest_seconds'] = time.perf_counter() - start
+
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results, stats = run_pipeline(args.keywords, master, args.export)
+            total = time.perf_counter() - start
+            if best is None or total < best[0]: best = (total, results, stats)
+        total, results, stats = best
+
+        # Separate run for memory: tracing slows allocation-heavy stages and would skew the timings
+        peak = None
+        if not args.no_memory:
+            tracemalloc.start()
+            run_pipeline(args.keywords, master, args.export)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        report.update({
+            'total_seconds': total,
+            'stages': {s: stats.get(s, 0.0) for s in STAGES},
+            'rows': {c: stats.get(c, 0) for c in COUNTERS},
+            'results': {kw: len(df) for kw, df in results.items()},
+            'peak_traced_mb': peak / 2**20 if peak is not None else None,
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        })
+        report['snapshot'] = snapshot(results) if (args.save_snapshots or args.check_snapshots) else None
+        return report
+    finally:
+        os.chdir(cwd)
+        search_engine.reset_readers()
+
+
+def print_report(report):
+    print(f"== {report['scale']}x: {report['chunks']} chunks, {report['rows']['rows_scanned']} rows scanned ({report['mode']}) ==")
+    if 'ingest_seconds' in report: print(f"  ingest (store + index build): {report['ingest_seconds']:.3f}s")
+    total = report['total_seconds']
+    for stage, secs in report['stages'].items():
+        if secs: print(f"  {stage:<14}{secs:9.3f}s {100 * secs / total:6.1f}%")
+    print(f"  {'total':<14}{total:9.3f}s")
+    rows = report['rows']
+    print(f"  rows: {rows['rows_scanned']} scanned, {rows['rows_matched']} matched, {rows['rows_kept']} kept")
+    print("  results: " + (", ".join(f"{kw} {n}" for kw, n in report['results'].items()) or "none"))
+    traced = f"peak traced {report['peak_traced_mb']:.1f} MB, " if report['peak_traced_mb'] is not None else ""
+    print(f"  memory: {traced}max RSS {report['max_rss_mb']:.1f} MB")
+
+
+def check_snapshot(report, directory):
+    path = os.path.join(directory, f"scale-{report['scale']}.json")
+    try:
+        with open(path, encoding='utf-8') as f:
+            expected = json.load(f)
+    except OSError:
+        print(f"  snapshot: MISSING ({path})")
+        return False
+    if expected == report['snapshot']:
+        print("  snapshot: SAME")
+        return True
+    changed = sorted(set(expected) ^ set(report['snapshot'])) or \
+        [kw for kw in expected if expected[kw] != report['snapshot'].get(kw)]
+    print(f"  snapshot: DIFF ({', '.join(changed)})")
+    return False
+
+
+def check_cli(args, report, workdir):
+    """Batch CLI over the same corpus with a real process pool -> same per-keyword counts, nothing skipped."""
+    directory = os.path.join(workdir, f"scale-{report['scale']}")
+    keyword_file = os.path.join(workdir, "keywords.txt")
+    with open(keyword_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(args.keywords))
+    diag_path = os.path.join(workdir, f"cli-{report['scale']}.json")
+    env = {**os.environ, 'RECRUITING_SEARCH_WORKERS': "2", 'RECRUITING_SEARCH_EXECUTOR': "process"}
+    run = subprocess.run([sys.executable, os.path.abspath(search_engine.__file__), keyword_file, '--offline',
+                          '--out', os.path.join(workdir, "cli.csv"), '--diagnostics', diag_path],
+                         cwd=directory, env=env, capture_output=True, text=True)
+    try:
+        with open(diag_path, encoding='utf-8') as f:
+            diag = json.load(f)
+    except (OSError, ValueError):
+        diag = None
+    if run.returncode == 0 and diag and diag['results'] == report['results'] and not diag['skipped']:
+        print("  cli (2 workers): SAME")
+        return True
+    print(f"  cli (2 workers): FAILED (exit {run.returncode}) {run.stderr.strip().splitlines()[-1:] or ''}")
+    return False
+
+
+def save_snapshot(report, directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"scale-{report['scale']}.json"), 'w', encoding='utf-8') as f:
+        json.dump(report['snapshot'], f, indent=1, sort_keys=True, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search pipeline over scaled copies of a chunk")
+    parser.add_argument('--source', default="chunk_74.csv", help="chunk CSV the corpora are built from")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--keywords', type=lambda s: [k.strip() for k in s.split(',') if k.strip()],
+                        default=BENCH_KEYWORDS, help="comma-separated, like the search box")
+    parser.add_argument('--master', help="local master DB CSV for the contact-match stage (default: none)")
+    parser.add_argument('--warm', action='store_true', help="build the corpus store + index before searching")
+    parser.add_argument('--export', choices=list(EXPORT_FORMATS), default='xlsx')
+    parser.add_argument('--repeat', type=int, default=1, help="runs per scale; the fastest is reported")
+    parser.add_argument('--no-memory', action='store_true', help="skip the extra tracemalloc run")
+    parser.add_argument('--json', help="also write the reports (without snapshots) here")
+    parser.add_argument('--save-snapshots', metavar='DIR')
+    parser.add_argument('--check-snapshots', metavar='DIR')
+    parser.add_argument('--check-cli', action='store_true', help="also run the batch CLI with 2 worker processes")
+    parser.add_argument('--workdir', help="where scaled corpora are written (default: a temp dir, removed)")
+    args = parser.parse_args(argv)
+    args.source = os.path.abspath(args.source)
+    for opt in ('master', 'json', 'save_snapshots', 'check_snapshots'):
+        if getattr(args, opt): setattr(args, opt, os.path.abspath(getattr(args, opt)))
+
+    master = load_master(args.master)
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="recruiting-bench-")
+    reports, ok = [], True
+    try:
+        for scale in args.scales:
+            report = bench_scale(args, scale, master, workdir)
+            print_report(report)
+            if args.check_snapshots: ok &= check_snapshot(report, args.check_snapshots)
+            if args.save_snapshots: save_snapshot(report, args.save_snapshots)
+            if args.check_cli: ok &= check_cli(args, report, workdir)
+            reports.append({k: v for k, v in report.items() if k != 'snapshot'})
+    finally:
+        if not args.workdir: shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=1)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
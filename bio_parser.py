@@ -0,0 +1,588 @@
+"""Bio parsing rules shared by the app, the ingest stage and batch tools.
+
+Pure functions only (no Streamlit): header parsing, junk-row detection, sport
+detection, role detection and keyword snippets.
+
+The junk / role word lists are compiled into `Rule` objects at import. Check
+them against the plain list scans over real data with:
+
+    python bio_parser.py verify [chunk_74.csv ...]
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Bump when any rule below changes: precomputed metadata tables are rebuilt.
+PARSER_VERSION = "v1.26"
+
+# STRICT LISTS
+FOOTBALL_INDICATORS = ["football", "quarterback", "linebacker", "touchdown", "nfl", "bowl", "recruiting", "fbs", "fcs", "interception", "tackle", "gridiron"]
+
+# V1.19: Expanded Non-Football List
+NON_FOOTBALL_INDICATORS = {
+    "Volleyball": ["volleyball", "set", "spike", "libero"], 
+    "Baseball": ["baseball", "inning", "homerun", "pitcher", "dugout"],
+    "Basketball": ["basketball", "nba", "dunk", "rebound", "hoop"], 
+    "Soccer": ["soccer", "goal", "striker", "fifa"],
+    "Softball": ["softball"], 
+    "Track": ["track", "sprint", "marathon"], 
+    "Swimming": ["swim", "dive", "pool", "breaststroke"], 
+    "Lacrosse": ["lacrosse", "stick"],
+    "Equestrian": ["equestrian", "horse", "rider", "hunt seat"], 
+    "Rowing": ["rowing", "crew", "coxswain", "regatta"],
+    "Field Hockey": ["field hockey"], 
+    "Water Polo": ["water polo"],
+    "Fencing": ["fencing", "foil", "saber", "epee"],
+    "Pistol": ["pistol", "shooting", "rifle", "smallbore"],
+    "Gymnastics": ["gymnastics", "vault", "beam"],
+    "Skiing": ["skiing", "slalom", "nordic", "alpine"],
+    "Bowling": ["bowling", "kegler"],
+    "Wrestling": ["wrestling", "grapple", "mat"] 
+}
+
+# V1.26: BANNED SCHOOL NAMES (Junk Headers)
+BANNED_SCHOOL_NAMES = [
+    "official site", "official website", "copyright", "powered by", "terms of service",
+    "privacy policy", "accessibility", "sidearm sports", "ad blocker", "main navigation",
+    "skip to main", "pause all rotators", "composite calendar", "related videos",
+    "ticket office", "student-athlete", "staff directory"
+]
+
+POISON_PILLS_TEXT = ["Women's Flag", "Flag Football"]
+BAD_NAMES = [
+    "Football Roster", "Football Schedule", "Composite Schedule", "Game Recap", 
+    "Menu", "Search", "Tickets", "Clemson Tiger Football", "University Athletics",
+    "National Champions", "Athletics Website", "Skip To Main Content", 
+    "Pause All Rotators", "Scoreboard", "Main Baseball", "Main Basketball",
+    "Story Links", "Related Videos", "Related News", "Composite Calendar",
+    "Official Site", "Official Website", "Copyright", "Terms of Service"
+]
+
+SCHOOL_ALIASES = {
+    "ASU": "Arizona State", "UCF": "Central Florida", "Ole Miss": "Mississippi", 
+    "FSU": "Florida State", "Miami": "Miami (FL)", "UConn": "Connecticut",
+    "LSU": "Louisiana State", "USC": "Southern California", "SMU": "Southern Methodist",
+    "TCU": "Texas Christian", "BYU": "Brigham Young", "FAU": "Florida Atlantic",
+    "FIU": "Florida International", "USF": "South Florida", "UNC": "North Carolina",
+    "NC State": "North Carolina State", "UVA": "Virginia", "VT": "Virginia Tech",
+    "GT": "Georgia Tech", "Pitt": "Pittsburgh", "Wash St": "Washington State",
+    "Miss St": "Mississippi State", "Okla St": "Oklahoma State", "Mich St": "Michigan State",
+    "Ohio State University": "Ohio State",
+    "The Ohio State University": "Ohio State"
+}
+
+# V1.26: Expanded Staff List (Medical, Ops, Academics)
+STRONG_STAFF_TITLES = [
+    "coordinator", "director", "manager", "analyst", "assistant", "specialist", 
+    "trainer", "video", "recruiting", "personnel", "chief", "scout", 
+    "dietitian", "nutrition", "ga", "grad assistant", "intern", "fellow", 
+    "admin", "strength", "conditioning", "performance", "player dev", 
+    "exec", "head", "gm", "ops", "medicine", "doctor", "dr.", "physician", "academic"
+]
+STRONG_PLAYER_TITLES = ["quarterback", "running back", "wide receiver", "tight end", "offensive line", "defensive line", "linebacker", "defensive back", "cornerback", "safety", "kicker", "punter", "snapper", "qb", "rb", "wr", "te", "ol", "dl", "lb", "db", "cb", "s", "k", "p", "ls", "athlete", "edge", "rush", "tackle", "guard", "center"]
+# V1.22: Bullet points and verbs in the NAME column
+NAME_FRAGMENTS = ["•", "*", "caught", "played", "appeared", "recorded", "started"]
+
+# --- V1.27: COMPILED RULE ENGINE ---
+class Rule:
+    """A substring rule: fires when ANY of its literals occurs in the text.
+
+    The literals are compiled into ONE alternation regex at import. `linear` is
+    the original `any(x in s for x in LIST)` scan, kept so `python bio_parser.py
+    verify` can prove both agree.
+    """
+
+    def __init__(self, name, literals):
+        self.name = name
+        self.literals = list(literals)
+        self.regex = re.compile("|".join(re.escape(x) for x in self.literals) or "(?!)")
+
+    def search(self, text):
+        """The literal that fired (leftmost in `text`), or None."""
+        m = self.regex.search(text)
+        return m.group() if m else None
+
+    def linear(self, text):
+        return next((x for x in self.literals if x in text), None)
+
+
+# All rules match LOWERED text
+POISON_RULE = Rule("poison_pill", [p.lower() for p in POISON_PILLS_TEXT])
+NAME_FRAGMENT_RULE = Rule("name_fragment", NAME_FRAGMENTS)
+SPORT_RULE = Rule("other_sport", [sport.lower() for sport in NON_FOOTBALL_INDICATORS])
+BANNED_SCHOOL_RULE = Rule("banned_school", BANNED_SCHOOL_NAMES)
+BAD_NAME_RULE = Rule("bad_name", [b.lower() for b in BAD_NAMES])
+FOOTBALL_NAME_RULE = Rule("football_name", ["football", "athletics"])
+COACH_RULE = Rule("coach", ["coach"])
+STAFF_RULE = Rule("staff", STRONG_STAFF_TITLES)
+PLAYER_RULE = Rule("player", STRONG_PLAYER_TITLES)
+RULES = [POISON_RULE, NAME_FRAGMENT_RULE, SPORT_RULE, BANNED_SCHOOL_RULE, BAD_NAME_RULE,
+         FOOTBALL_NAME_RULE, COACH_RULE, STAFF_RULE, PLAYER_RULE]
+
+
+def _fired(rule, *texts):
+    """'rule:literal' for the first text the rule fires on, else None."""
+    for text in texts:
+        hit = rule.search(text)
+        if hit is not None: return f"{rule.name}:{hit}"
+    return None
+
+
+def header_reject_rule(name_check, title_check, school_check):
+    """V1.22 junk-header checks on the LOWERED header fields -> the rule that rejects the row, or None."""
+    # 1. Bullet points and verbs / 2. sport names in the NAME / 3. "Official Site" in School/Name
+    rule = (_fired(NAME_FRAGMENT_RULE, name_check) or _fired(SPORT_RULE, name_check)
+            or _fired(BANNED_SCHOOL_RULE, school_check, name_check))
+    if rule: return rule
+    # 4. Overly long "names" (paragraphs)
+    if len(name_check) > 40: return "long_name"
+    # 5. School names masquerading as people
+    if ("university" in name_check or "college" in name_check) and \
+       ("unknown" in title_check or "athletics" in title_check):
+        return "school_as_name"
+    return None
+
+
+def junk_rule(name, title, school):
+    """V1.19 / V1.22 junk checks on a PARSED header -> the rule that marks it junk, or None."""
+    name_check = str(name).lower()
+    return (_fired(BAD_NAME_RULE, name_check) or _fired(FOOTBALL_NAME_RULE, name_check)
+            or _fired(SPORT_RULE, str(school).lower(), str(title).lower()))
+
+
+def role_rule(title):
+    """(role, rule that decided it) from a title."""
+    title_lower = str(title).lower()
+    rule = _fired(COACH_RULE, title_lower) or _fired(STAFF_RULE, title_lower)
+    if rule: return "COACH/STAFF", rule
+    rule = _fired(PLAYER_RULE, title_lower)
+    if rule: return "PLAYER", rule
+    return "PLAYER", "default"
+
+
+def classify_batch(rows):
+    """Rule decisions for many (name, title, school) tuples at once, for debugging.
+
+    Returns a DataFrame with, per tuple: 'reject' (header_reject_rule), 'junk'
+    (junk_rule), 'role' and 'role_rule' (role_rule) - each rule column holds the
+    'rule:literal' that fired, or None. Every rule runs once per column.
+    """
+    df = pd.DataFrame(list(rows), columns=['Name', 'Title', 'School'], dtype=object)
+    name, title, school = (pd.Series(["" if v is None else str(v).lower() for v in df[c]], index=df.index, dtype=object)
+                           for c in ['Name', 'Title', 'School'])
+
+    def fired(rule, text):
+        hits = text.str.extract(f"({rule.regex.pattern})", expand=False)
+        return (rule.name + ":" + hits).where(hits.notna(), None).astype(object)
+
+    def first(*columns):
+        out = columns[0]
+        for col in columns[1:]:
+            out = out.where(out.notna(), col)
+        return out
+
+    none = pd.Series(None, index=df.index, dtype=object)
+    long_name = none.mask(name.str.len() > 40, "long_name")
+    school_as_name = none.mask((name.str.contains("university", regex=False) | name.str.contains("college", regex=False))
+                               & (title.str.contains("unknown", regex=False) | title.str.contains("athletics", regex=False)),
+                               "school_as_name")
+    out = pd.DataFrame(index=df.index)
+    out['reject'] = first(fired(NAME_FRAGMENT_RULE, name), fired(SPORT_RULE, name), fired(BANNED_SCHOOL_RULE, school),
+                          fired(BANNED_SCHOOL_RULE, name), long_name, school_as_name)
+    out['junk'] = first(fired(BAD_NAME_RULE, name), fired(FOOTBALL_NAME_RULE, name),
+                        fired(SPORT_RULE, school), fired(SPORT_RULE, title))
+    staff = first(fired(COACH_RULE, title), fired(STAFF_RULE, title))
+    out['role'] = np.where(staff.notna(), "COACH/STAFF", "PLAYER")
+    out['role_rule'] = first(staff, fired(PLAYER_RULE, title), pd.Series("default", index=df.index, dtype=object))
+    return out.astype(object).where(out.notna(), None)
+
+
+# --- HELPER FUNCTIONS ---
+def normalize_text_v1_26(text):
+    if pd.isna(text): return ""
+    text = str(text).lower()
+    text = text.replace('.', '').replace("'", "").strip()
+    # Explicitly remove 'athletics'
+    for word in ['university', 'univ', 'college', 'the', 'of', 'athletics', 'inst']:
+        text = text.replace(word, '')
+    return re.sub(r'[^a-z0-9]', '', text).strip()
+
+def detect_sport(bio):
+    text = str(bio).lower()
+    if POISON_RULE.search(text[:1000]): return None
+    
+    # Check for Non-Football Sports
+    fb_score = sum(text.count(w) for w in FOOTBALL_INDICATORS)
+    for sport, keywords in NON_FOOTBALL_INDICATORS.items():
+        # Strict check for other sports
+        sport_score = sum(text.count(w) for w in keywords)
+        if sport_score > fb_score + 1: return None
+        
+    return "Football"
+
+def detect_sport_batch(bios, full_scores=False):
+    """V1.27: detect_sport() for a whole Series, scored column-wise.
+
+    Returns a DataFrame on the same index: 'poisoned', a 'football' score, one
+    score column per NON_FOOTBALL_INDICATORS sport and the verdict 'is_football'
+    (True exactly where detect_sport() returns "Football"). Each distinct bio is
+    lowered once and scored once. Like detect_sport(), a bio stops being scored
+    once it is rejected (remaining scores are -1) unless full_scores=True.
+    """
+    codes, uniques = pd.factorize(pd.Series([b if isinstance(b, str) else str(b) for b in bios], dtype=object))
+    lowered = [u.lower() for u in uniques]
+    # ASCII indicator words match UTF-8 bytes exactly where they match the str,
+    # and bytes never pay the 2-4 byte/char cost of non-Latin-1 bios
+    texts = [t.encode('utf-8') for t in lowered]
+    poisoned = np.array([POISON_RULE.search(t[:1000]) is not None for t in lowered], dtype=bool)
+
+    def score(words, rows):
+        total = np.full(len(texts), -1, dtype=np.int64)
+        total[rows] = 0
+        for w in words:
+            wb = w.encode('utf-8')
+            total[rows] += np.fromiter((texts[i].count(wb) for i in rows), dtype=np.int64, count=len(rows))
+        return total
+
+    alive = np.ones(len(texts), dtype=bool) if full_scores else ~poisoned
+    scores = {'poisoned': poisoned, 'football': score(FOOTBALL_INDICATORS, np.flatnonzero(alive))}
+    outscored = np.zeros(len(texts), dtype=bool)
+    for sport, keywords in NON_FOOTBALL_INDICATORS.items():
+        scores[sport] = score(keywords, np.flatnonzero(alive & ~outscored) if not full_scores else np.flatnonzero(alive))
+        outscored |= (scores[sport] >= 0) & (scores[sport] > scores['football'] + 1)
+    scores['is_football'] = ~(poisoned | outscored)
+
+    return pd.DataFrame(scores).iloc[codes].set_index(bios.index)
+
+def clean_player_title(title, bio_text):
+    t_clean = str(title).strip().lower()
+    if "assistant" in t_clean or "coach" in t_clean or "manager" in t_clean: return title
+    return "Football"
+
+def determine_role_v1_26(title, bio_text):
+    # V1.27: coach -> staff -> player title rules (compiled); anything else is a PLAYER
+    return role_rule(title)[0]
+
+def split_header_v1_26(bio):
+    """Raw Name / Title / School / Last from the first header line (no cleaning, no junk checks)."""
+    lines = [L.strip() for L in str(bio).split('\n') if L.strip()][:15]
+    header = None
+    for delimiter in [" - ", " | ", " : "]:
+        header = next((L for L in lines if delimiter in L and "http" not in L), None)
+        if header: break
+        
+    extracted = {'Name': None, 'Title': "Unknown", 'School': "Unknown", 'Role': 'PLAYER', 'Last': ''}
+    
+    if header:
+        parts = re.split(r' - | \| | : ', header)
+        if len(parts) >= 2:
+            extracted['Name'] = parts[0].strip()
+            extracted['Last'] = parts[0].strip().split(' ')[-1]
+            extracted['School'] = parts[-1].strip()
+            if len(parts) > 2: extracted['Title'] = parts[1].strip()
+    return extracted
+
+def parse_header_v1_26(bio):
+    extracted = split_header_v1_26(bio)
+            
+    # --- V1.22: ADVANCED JUNK ROW DETECTION ---
+    name_check = extracted['Name'].lower() if extracted['Name'] else ""
+    title_check = extracted['Title'].lower() if extracted['Title'] else ""
+    school_check = extracted['School'].lower() if extracted['School'] else ""
+    if header_reject_rule(name_check, title_check, school_check): return None
+    
+    if "University" in extracted['Title'] or "Athletics" in extracted['Title'] or extracted['Title'] == "Unknown":
+        match = re.search(r'(?:Title|Position)[:\s]+([A-Za-z \-\&]+?)(?=\n|Email|Phone|Bio)', str(bio), re.IGNORECASE)
+        if match: extracted['Title'] = match.group(1).strip()
+
+    # --- v1.23: CLEAN SCHOOL NAME (REMOVE 'ATHLETICS' AND 'FOOTBALL') ---
+    if extracted['School']:
+        extracted['School'] = extracted['School'].replace("Athletics", "").strip()
+        if extracted['School'].endswith(" Football"):
+             extracted['School'] = extracted['School'].replace(" Football", "").strip()
+        # V1.26: BANNED SCHOOL FIX (Set to Unknown if generic)
+        if BANNED_SCHOOL_RULE.search(extracted['School'].lower()):
+            extracted['School'] = "Unknown"
+
+    for alias, real in SCHOOL_ALIASES.items():
+        if alias.lower() in extracted['School'].lower(): extracted['School'] = real
+        
+    extracted['Role'] = determine_role_v1_26(extracted['Title'], bio)
+    
+    # --- V1.8: FORCE FOOTBALL TITLE FOR PLAYERS ---
+    if extracted['Role'] == 'PLAYER':
+        extracted['Title'] = "Football"
+        
+    return extracted
+
+# --- V1.27: PER-BIO METADATA (computed once at ingest, joined at search time) ---
+META_COLUMNS = ['Name', 'Last', 'Title', 'School', 'Role', 'is_football', 'junk', 's_key', 'n_key', 'l_key']
+
+def bio_metadata(bio, is_football=None):
+    """Everything about a bio that depends on neither the keyword nor the master DB.
+
+    Pass `is_football` from detect_sport_batch() when classifying many bios.
+    """
+    if is_football is None: is_football = detect_sport(bio) == "Football"
+    meta = parse_header_v1_26(bio)
+    if meta is None:
+        return {'Name': "Unknown", 'Last': "", 'Title': "Unknown", 'School': "Unknown", 'Role': 'PLAYER',
+                'is_football': is_football, 'junk': True, 's_key': "", 'n_key': "", 'l_key': ""}
+
+    name = meta['Name'] or "Unknown"
+    # --- V1.19 / V1.22: BAD NAMES + STRICT SPORT SANITATION ---
+    junk = junk_rule(name, meta['Title'], meta['School']) is not None
+
+    return {
+        'Name': name,
+        'Last': meta['Last'],
+        'Title': meta['Title'],
+        'School': meta['School'],
+        'Role': meta['Role'],
+        'is_football': is_football,
+        'junk': junk,
+        's_key': normalize_text_v1_26(meta['School']),
+        'n_key': normalize_text_v1_26(name),
+        'l_key': normalize_text_v1_26(meta['Last']),
+    }
+
+# --- KEYWORD PATTERNS ---
+# Between the words of a Phrase: any run of punctuation / whitespace
+PHRASE_GAP = "[^A-Za-z0-9]+"
+
+
+class Phrase(str):
+    """A keyword matched word by word: 'st louis' finds 'St. Louis', 'texas a m' finds 'Texas A&M'.
+
+    Its text is the lowered words joined by single spaces (fuzzy variants are Phrases).
+    A plain str keyword is matched literally.
+    """
+    __slots__ = ()
+
+
+def keyword_regex(keyword):
+    """The (case-insensitive) regex a keyword is searched with."""
+    if isinstance(keyword, Phrase): return PHRASE_GAP.join(re.escape(word) for word in keyword.split())
+    return re.escape(keyword)
+
+
+# --- V1.27: SNIPPET ENGINE ---
+SNIPPET_RADIUS = 60
+PRIORITY_WORDS = ["hometown", "native", "high school", "born", "raised", "from", "attended", "product of"]
+LIST_WORDS = ["roster", "schedule", "statistics"]
+# High-hit keywords ('a', 'the') score every window at once from one scan of the bio
+BATCH_SCORE_MIN_MATCHES = 256
+
+
+CONTEXT_WORDS = PRIORITY_WORDS + LIST_WORDS + [","]
+# Code-point arrays of the context words (found with numpy, overlaps included)
+_CONTEXT_CODES = [np.array([ord(ch) for ch in w], dtype=np.uint32) for w in CONTEXT_WORDS]
+
+
+def _folded_codes(text):
+    """Code points of `text` as `window.lower()` sees them for CONTEXT_WORDS: ASCII
+    upper-case folded, CR/LF read as spaces. One entry per character, so offsets
+    are the original text's (no other character lowers onto these words)."""
+    codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32).copy()
+    upper = (codes >= 65) & (codes <= 90)
+    codes[upper] += 32
+    codes[(codes == 10) | (codes == 13)] = 32
+    return codes
+
+
+def _occurrences(codes, word):
+    """Start offsets of every (possibly overlapping) occurrence of `word`, sorted."""
+    if len(codes) < len(word): return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(codes[:len(codes) - len(word) + 1] == word[0])
+    for k in range(1, len(word)):
+        starts = starts[codes[starts + k] == word[k]]
+    return starts
+
+
+def _snippet_regex(keyword):
+    """Escaped keyword for the ORIGINAL text. The V1.25 sniper searched a copy with line
+    breaks turned into spaces, so a space also matches CR/LF and a CR/LF matches nothing."""
+    if isinstance(keyword, Phrase): return keyword_regex(keyword)
+    return "".join("[ \n\r]" if ch == " " else "(?!)" if ch in "\n\r" else re.escape(ch) for ch in keyword)
+
+
+# A snippet and its ranking features (see SnippetEngine.scored)
+Snippet = namedtuple('Snippet', ['text', 'score', 'matches', 'position'])
+
+
+class SnippetEngine:
+    """V1.27: get_smart_snippet for ONE keyword, patterns compiled once per search.
+
+    Matches run over the original bio; only the ~120-char window around each match
+    is copied (and has its line breaks cleaned) for scoring. Same scores, same
+    winner, same ⚠️ fallback as the V1.25 sniper.
+    """
+
+    def __init__(self, keyword):
+        body = _snippet_regex(keyword)
+        self.strict = re.compile(rf"\b{body}\b", re.IGNORECASE)
+        self.loose = re.compile(body, re.IGNORECASE)
+
+    def snippet(self, text):
+        return self.scored(text).text
+
+    def scored(self, text):
+        """The snippet plus what ranking needs: its context score, the match count
+        and where the first match sits (0 = start of the bio, 1 = end)."""
+        text = str(text)
+        # 1. Look for STRICT Word Matches (Prevent 'JaylenColumbus'); substring only if there are none
+        spans = [m.span() for m in self.strict.finditer(text)] or [m.span() for m in self.loose.finditer(text)]
+        if not spans: return Snippet("", 0, 0, 1.0)
+        position = spans[0][0] / len(text)
+        if len(spans) >= BATCH_SCORE_MIN_MATCHES:
+            start, end, valid_snippet_found, max_score = self._best_window(text, spans)
+            best_snippet = text[start:end].replace('\n', ' ').replace('\r', ' ')
+            if not valid_snippet_found: return Snippet(f"⚠️ ...{best_snippet}...", max_score, len(spans), position)
+            return Snippet(f"...{best_snippet}...", max_score, len(spans), position)
+
+        best_snippet = None
+        max_score = -999
+        valid_snippet_found = False
+        for m_start, m_end in spans:
+            snippet = text[max(0, m_start - SNIPPET_RADIUS):m_end + SNIPPET_RADIUS].replace('\n', ' ').replace('\r', ' ')
+            snippet_lower = snippet.lower()
+
+            # Boost for hometown context
+            score = 0
+            for p in PRIORITY_WORDS:
+                if p in snippet_lower: score += 10
+            # V1.22: Penalize generic lists
+            for w in LIST_WORDS:
+                if w in snippet_lower:
+                    score -= 15
+                    break
+            # V1.23: ROSTER DUMP DETECTOR
+            if snippet.count(',') > 3: score -= 50
+            else: valid_snippet_found = True # Found a non-list match
+            # V1.22: Penalize very short snippets
+            if len(snippet) < 30: score -= 5
+
+            if score > max_score:
+                max_score = score
+                best_snippet = snippet
+
+        # V1.24: FALLBACK LOGIC
+        if not valid_snippet_found: return Snippet(f"⚠️ ...{best_snippet}...", max_score, len(spans), position)
+        return Snippet(f"...{best_snippet}...", max_score, len(spans), position)
+
+    @staticmethod
+    def _best_window(text, spans):
+        """Score ALL match windows at once with numpy, from one pass over the bio.
+        -> (start, end, valid_snippet_found, score) of the first best-scoring window."""
+        spans = np.array(spans, dtype=np.int64)
+        win_start = np.maximum(spans[:, 0] - SNIPPET_RADIUS, 0)
+        win_end = np.minimum(spans[:, 1] + SNIPPET_RADIUS, len(text))
+        codes = _folded_codes(text)
+
+        def in_window(i):
+            # Any occurrence that starts AND ends inside the window
+            occ = _occurrences(codes, _CONTEXT_CODES[i])
+            return np.searchsorted(occ, win_end - len(CONTEXT_WORDS[i]), 'right') > np.searchsorted(occ, win_start, 'left')
+
+        score = np.zeros(len(spans), dtype=np.int64)
+        for i in range(len(PRIORITY_WORDS)):
+            score += 10 * in_window(i)
+        listed = np.zeros(len(spans), dtype=bool)
+        for i in range(len(PRIORITY_WORDS), len(PRIORITY_WORDS) + len(LIST_WORDS)):
+            listed |= in_window(i)
+        score -= 15 * listed
+        commas = _occurrences(codes, _CONTEXT_CODES[-1])
+        roster_dump = np.searchsorted(commas, win_end, 'left') - np.searchsorted(commas, win_start, 'left') > 3
+        score -= 50 * roster_dump
+        score -= 5 * (win_end - win_start < 30)
+        best = int(np.argmax(score))  # first max, like the strict '>' in the loop
+        return int(win_start[best]), int(win_end[best]), not roster_dump.all(), int(score[best])
+
+    def snippets(self, bios):
+        """Snippets for a whole match set, in order."""
+        return [self.snippet(bio) for bio in bios]
+
+    def scored_snippets(self, bios):
+        return [self.scored(bio) for bio in bios]
+
+
+def get_smart_snippet(text, keyword):
+    """V1.25: CONTEXT SNIPER (Regex Word Boundary)."""
+    return SnippetEngine(keyword).snippet(text)
+
+
+# --- V1.27: RULE ENGINE VERIFICATION ---
+def verify_rules(bios, log=print):
+    """Check the compiled rules against the list scans they replaced, and the batch
+    API against the per-row decisions, over real bios. Returns the mismatch count."""
+    mismatches = 0
+    checked = 0
+    reject_rows, meta_rows, expected = [], [], []
+
+    def check(rule, text):
+        nonlocal mismatches, checked
+        checked += 1
+        if (rule.search(text) is None) != (rule.linear(text) is None):
+            mismatches += 1
+            log(f"  ! {rule.name}: compiled and list scan disagree on {text[:60]!r}")
+
+    for bio in bios:
+        text = str(bio).lower()
+        check(POISON_RULE, text[:1000])
+        raw = split_header_v1_26(bio)
+        name_check = raw['Name'].lower() if raw['Name'] else ""
+        school_check = raw['School'].lower()
+        for rule, field in [(NAME_FRAGMENT_RULE, name_check), (SPORT_RULE, name_check),
+                            (BANNED_SCHOOL_RULE, school_check), (BANNED_SCHOOL_RULE, name_check)]:
+            check(rule, field)
+        reject_rows.append((raw['Name'] or "", raw['Title'], raw['School']))
+
+        meta = parse_header_v1_26(bio)
+        if meta is None: continue
+        name = meta['Name'] or "Unknown"
+        for rule, field in [(BAD_NAME_RULE, name), (FOOTBALL_NAME_RULE, name), (SPORT_RULE, meta['School']),
+                            (SPORT_RULE, meta['Title']), (COACH_RULE, meta['Title']), (STAFF_RULE, meta['Title']),
+                            (PLAYER_RULE, meta['Title']), (BANNED_SCHOOL_RULE, meta['School'])]:
+            check(rule, str(field).lower())
+        meta_rows.append((name, meta['Title'], meta['School']))
+        expected.append((junk_rule(name, meta['Title'], meta['School']) is not None, meta['Role']))
+
+    rejects = classify_batch(reject_rows)
+    per_row = [header_reject_rule(*(str(v).lower() for v in row)) is not None for row in reject_rows]
+    bad = int((rejects['reject'].notna().to_numpy() != np.array(per_row, dtype=bool)).sum())
+    batch = classify_batch(meta_rows)
+    if expected:
+        junk, role = zip(*expected)
+        bad += int((batch['junk'].notna().to_numpy() != np.array(junk, dtype=bool)).sum())
+        bad += int((batch['role'].to_numpy() != np.array(role, dtype=object)).sum())
+    if bad: log(f"  ! classify_batch disagrees with the per-row rules on {bad} decisions")
+    mismatches += bad
+
+    log(f"{len(reject_rows)} bios, {checked} rule checks, {len(meta_rows)} parsed headers")
+    fired = pd.concat([rejects['reject'], batch['junk'], batch['role_rule']]).dropna()
+    for rule, count in fired.str.split(':').str[0].value_counts().items():
+        log(f"  {rule}: {count}")
+    return mismatches
+
+
+def main(argv=None):
+    import argparse
+    import glob
+    from corpus_store import read_bios
+
+    parser = argparse.ArgumentParser(description="Check the compiled bio rules against chunk_*.csv")
+    parser.add_argument('command', choices=['verify'])
+    parser.add_argument('files', nargs='*', help="chunk CSVs (default: chunk_*.csv)")
+    args = parser.parse_args(argv)
+
+    files = args.files or sorted(glob.glob("chunk_*.csv"))
+    mismatches = verify_rules(bio for f in files for bio in read_bios(f))
+    print("OK: same decisions" if not mismatches else f"FAILED: {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
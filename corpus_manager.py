@@ -0,0 +1,354 @@
+"""Live corpus: watch the chunk directory, rebuild in the background, publish immutable snapshots.
+
+`CorpusManager` is to the chunk files what master_db.MasterSource is to the
+coach sheet. A daemon thread polls the data directory (chunk_*.csv names,
+mtimes and sizes - after ingesting RECRUITING_RAW_DIR into it, if set) and,
+once a change has held still for one poll, builds the next version off to
+the side:
+
+  1. new and changed chunks are copied into .corpus_snapshot/ under a
+     content-addressed name (chunk_00007-<sha1>.csv); unchanged chunks are
+     shared with the previous version
+  2. the columnar store and the search index are built for the copies
+     (.corpus_snapshot/.corpus_store, .corpus_snapshot/.search_index). A copy
+     whose content the data directory's own store / index already covers
+     (corpus_store.py build, search_index.py build, ingest.py --build) gets
+     those files hard-linked in instead of being parsed and tokenized again
+  3. snapshot.json is written - the commit point - and the new
+     CorpusSnapshot is swapped in with one assignment
+
+A search takes `current()` once and keeps it for its whole pass, so a reload
+never changes the files under it; searches started afterwards get the new
+version. Snapshot files are never modified, only deleted once no live
+CorpusSnapshot (a running search, results waiting for export) refers to them;
+their store and index files go with them.
+Until the first build is published, searches read the chunk files in place.
+
+    python corpus_manager.py refresh | watch | status [--data-dir DIR] [--raw-dir DIR]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import weakref
+
+from corpus_store import (MANIFEST_NAME, STORE_DIR, STORE_VERSION, build_store, file_stamp, load_manifest,
+                          save_manifest)
+from diagnostics import get_logger, log_event
+from ingest import ingest, list_raw_files
+from search_index import INDEX_DIR, INDEX_VERSION, build_index
+
+CHUNK_PATTERN = "chunk_*.csv"
+SNAPSHOT_DIR = ".corpus_snapshot"
+SNAPSHOT_FORMAT = 1
+POLL_INTERVAL = float(os.environ.get("RECRUITING_CORPUS_POLL_SECS", "10"))
+RAW_DIR = os.environ.get("RECRUITING_RAW_DIR")
+# Per-chunk build outputs: (directory, manifest version, file suffixes after the chunk name)
+BUILDS = ((STORE_DIR, STORE_VERSION, (".arrow", ".meta.arrow")), (INDEX_DIR, INDEX_VERSION, (".idx",)))
+
+
+class CorpusSnapshot:
+    """One corpus version: the chunk files a search reads, in search (= dedupe) order.
+
+    Version 0 is the data directory as it is right now (nothing published yet).
+    A published snapshot's files stay on disk, unchanged, for as long as the
+    snapshot object is alive.
+    """
+    __slots__ = ('version', 'chunk_files', 'created', '__weakref__')
+
+    def __init__(self, version, chunk_files, created=None):
+        self.version = version
+        self.chunk_files = tuple(chunk_files)
+        self.created = time.time() if created is None else created
+
+
+def list_chunk_files(data_dir="."):
+    """The data directory's chunks in search order (as search_engine.list_chunks names them for '.')."""
+    return sorted(glob.glob(CHUNK_PATTERN if data_dir == "." else os.path.join(data_dir, CHUNK_PATTERN)))
+
+
+def stamp_listing(paths):
+    """{file name: (mtime_ns, size)}."""
+    listing = {}
+    for path in paths:
+        try: listing[os.path.basename(path)] = file_stamp(path)
+        except OSError: pass  # deleted between listing and stat
+    return listing
+
+
+def _link_files(pairs, written_before):
+    """Hard-link (copy, across file systems) each (src, dst); False if a src is newer than `written_before`."""
+    try:
+        if any(os.stat(src).st_mtime_ns > written_before for src, _ in pairs): return False
+        for src, dst in pairs:
+            tmp = dst + ".tmp"
+            if os.path.exists(tmp): os.remove(tmp)
+            try: os.link(src, tmp)
+            except OSError: shutil.copyfile(src, tmp)
+            os.replace(tmp, dst)  # builds replace files, never rewrite them: a link stays valid
+    except OSError:
+        return False
+    return True
+
+
+class CorpusManager:
+    """Never blocks a search: the current snapshot is served while the next one is built.
+
+    `current()` always returns a complete CorpusSnapshot. Reloads are serialized
+    on one lock; readers never take it.
+    """
+
+    def __init__(self, data_dir=".", raw_dir=RAW_DIR, snapshot_dir=None, poll_interval=POLL_INTERVAL):
+        self.data_dir = data_dir
+        self.raw_dir = raw_dir
+        self.snapshot_dir = snapshot_dir or os.path.normpath(os.path.join(data_dir, SNAPSHOT_DIR))
+        self.poll_interval = poll_interval
+        self.last_error = None
+        self.last_refresh = None  # (time, outcome)
+        self._meta = {'chunks': []}
+        self._snapshot = None
+        self._published = []  # weakrefs to published snapshots that may still be in use
+        self._seen = None  # chunk listing at the previous poll
+        self._raw_seen = None  # raw file listing at the last ingest
+        self._logger = get_logger("corpus")
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        if self._snapshot is not None: return self._snapshot
+        return CorpusSnapshot(0, list_chunk_files(self.data_dir))
+
+    @property
+    def version(self):
+        return self._meta.get('version', 0)
+
+    # --- snapshot ---
+    def _path(self, name):
+        return os.path.join(self.snapshot_dir, name)
+
+    def _meta_path(self):
+        return self._path("snapshot.json")
+
+    def load_snapshot(self):
+        """Publish the last snapshot on disk. False if there is none (or its files are gone)."""
+        try:
+            with open(self._meta_path(), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('format') != SNAPSHOT_FORMAT: return False
+            if not all(os.path.exists(self._path(c['file'])) for c in meta['chunks']): return False
+        except Exception:
+            return False
+        self._publish(meta)
+        return True
+
+    def _write_meta(self, meta):
+        with open(self._meta_path() + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(self._meta_path() + ".tmp", self._meta_path())
+
+    def _publish(self, meta):
+        snapshot = CorpusSnapshot(meta['version'], [self._path(c['file']) for c in meta['chunks']], meta['created'])
+        self._meta = meta
+        self._published.append(weakref.ref(snapshot))
+        self._snapshot = snapshot
+
+    def _live_files(self):
+        """Chunk copies some live snapshot still reads (the current one included)."""
+        snapshots = [s for s in (ref() for ref in self._published) if s is not None]
+        self._published = [weakref.ref(s) for s in snapshots]
+        return {f for s in snapshots for f in s.chunk_files}
+
+    def _collect(self):
+        """Delete the chunk copies no live snapshot refers to any more, and their store and index files."""
+        live = {os.path.basename(f) for f in self._live_files()}
+        try: names = os.listdir(self.snapshot_dir)
+        except OSError: return
+        for name in names:
+            if name.startswith("chunk_") and name.endswith(".csv") and name not in live:
+                try: os.remove(self._path(name))
+                except OSError: pass
+        for build_dir, version, _ in BUILDS:
+            directory = self._path(build_dir)
+            try: names = os.listdir(directory)
+            except OSError: continue
+            # chunk_00007-<sha1>.csv.arrow / .meta.arrow / .idx (and their .tmp leftovers)
+            dead = [name for name in names if name.partition(".csv.")[1] and name.startswith("chunk_")
+                    and name.partition(".csv.")[0] + ".csv" not in live]
+            if not dead: continue
+            for name in dead:
+                try: os.remove(os.path.join(directory, name))
+                except OSError: pass
+            manifest = load_manifest(directory, version)
+            if any(key not in live for key in manifest['chunks']):
+                manifest['chunks'] = {k: e for k, e in manifest['chunks'].items() if k in live}
+                save_manifest(manifest, directory)
+
+    def _copy_chunk(self, name):
+        """Copy a data-directory chunk in under its content hash -> entry, or None if it changed meanwhile."""
+        src = os.path.join(self.data_dir, name)
+        stamp = file_stamp(src)
+        h = hashlib.sha1()
+        tmp = self._path(name + ".tmp")
+        with open(src, 'rb') as fin, open(tmp, 'wb') as fout:
+            for block in iter(lambda: fin.read(1 << 20), b""):
+                h.update(block)
+                fout.write(block)
+        if file_stamp(src) != stamp:
+            os.remove(tmp)
+            return None
+        sha1 = h.hexdigest()
+        file = f"{os.path.splitext(name)[0]}-{sha1[:12]}.csv"
+        # Same content already in (an older version): keep that file, its store/index entries stay fresh
+        if os.path.exists(self._path(file)): os.remove(tmp)
+        else: os.replace(tmp, self._path(file))
+        return {'name': name, 'file': file, 'mtime_ns': stamp[0], 'size': stamp[1], 'sha1': sha1}
+
+    # --- reuse ---
+    def _adopt_builds(self, chunks):
+        """Link in the data directory's own store / index files for copies with the same content -> count.
+
+        build_store / build_index then find those copies fresh. A chunk's files are only taken
+        if the manifest vouching for them was saved after they were written (no build in progress).
+        """
+        adopted = 0
+        for build_dir, version, suffixes in BUILDS:
+            source, target = os.path.join(self.data_dir, build_dir), self._path(build_dir)
+            built = load_manifest(source, version)['chunks']
+            if not built: continue
+            try: saved = os.stat(os.path.join(source, MANIFEST_NAME)).st_mtime_ns
+            except OSError: continue
+            os.makedirs(target, exist_ok=True)
+            manifest = load_manifest(target, version)
+            for entry in chunks:
+                theirs = built.get(entry['name'])
+                if entry['file'] in manifest['chunks'] or not theirs or theirs['sha1'] != entry['sha1']: continue
+                if not _link_files([(os.path.join(source, entry['name'] + s), os.path.join(target, entry['file'] + s))
+                                    for s in suffixes], saved): continue
+                mtime_ns, size = file_stamp(self._path(entry['file']))
+                manifest['chunks'][entry['file']] = dict(theirs, mtime_ns=mtime_ns, size=size)
+                adopted += 1
+            save_manifest(manifest, target)
+        return adopted
+
+    # --- refresh ---
+    def refresh(self, settle=True):
+        """One poll: 'updated', 'unchanged' or 'settling' (a change is still being written).
+
+        settle=False builds a change at once instead of waiting one poll for it to hold still.
+        """
+        with self._refresh_lock:
+            outcome = self._refresh(settle)
+            self.last_refresh = (time.time(), outcome)
+            return outcome
+
+    def _refresh(self, settle):
+        if self.raw_dir:
+            raw = stamp_listing(list_raw_files([self.raw_dir]))
+            if raw != self._raw_seen:
+                ingest([self.raw_dir], self.data_dir, log=self._logger.info)
+                self._raw_seen = raw
+        found = stamp_listing(list_chunk_files(self.data_dir))
+        previous = {c['name']: c for c in self._meta['chunks']}
+        if self._snapshot is not None and found == {n: (c['mtime_ns'], c['size']) for n, c in previous.items()}:
+            self._seen = found
+            self._collect()
+            return 'unchanged'
+        if settle and found != self._seen:
+            self._seen = found
+            return 'settling'
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        chunks, copied = [], 0
+        for name, stamp in sorted(found.items()):
+            entry = previous.get(name)
+            if not entry or (entry['mtime_ns'], entry['size']) != stamp:
+                entry = self._copy_chunk(name)
+                if entry is None: return 'settling'
+                copied += 1
+            chunks.append(entry)
+
+        # Build for every file a live snapshot reads: anything else drops out of the store and index
+        files = [self._path(c['file']) for c in chunks]
+        live = sorted(self._live_files() | set(files))
+        start = time.perf_counter()
+        adopted = self._adopt_builds(chunks)
+        store = build_store(live, os.path.join(self.snapshot_dir, STORE_DIR), log=self._logger.info)
+        index = build_index(live, os.path.join(self.snapshot_dir, INDEX_DIR), log=self._logger.info)
+
+        meta = {'format': SNAPSHOT_FORMAT, 'version': self.version + 1, 'created': time.time(), 'chunks': chunks}
+        self._write_meta(meta)
+        self._publish(meta)
+        self._collect()
+        self.last_error = None
+        log_event(self._logger, "corpus_published", version=meta['version'], chunks=len(chunks),
+                  copied=copied, adopted=adopted, store=store, index=index, build_seconds=round(time.perf_counter() - start, 3))
+        return 'updated'
+
+    # --- lifecycle ---
+    def start(self, background=True):
+        """Serve the last published snapshot now; watch and rebuild on a daemon thread.
+
+        background=False: one synchronous refresh, no thread.
+        """
+        self.load_snapshot()
+        if not background:
+            self.refresh(settle=False)
+            return self
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="corpus-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: self.refresh()
+            except Exception as e:
+                self.last_error = repr(e)
+                log_event(self._logger, "corpus_refresh_failed", error=repr(e))
+            self._stop.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish chunk_*.csv as an immutable, indexed corpus snapshot")
+    parser.add_argument('command', choices=['refresh', 'watch', 'status'])
+    parser.add_argument('--data-dir', default=".", help="directory holding chunk_*.csv (default: current)")
+    parser.add_argument('--raw-dir', default=RAW_DIR, help="also ingest raw scraped CSVs from here first")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="seconds between polls (watch)")
+    args = parser.parse_args(argv)
+
+    manager = CorpusManager(args.data_dir, args.raw_dir, poll_interval=args.interval)
+    if args.command == 'status':
+        if not manager.load_snapshot():
+            print("No snapshot published yet")
+            return 0
+        stale = set(stamp_listing(list_chunk_files(args.data_dir)).items()) ^ {(c['name'], (c['mtime_ns'], c['size']))
+                                                            for c in manager._meta['chunks']}
+        print(f"Snapshot v{manager.version}: {len(manager.current().chunk_files)} chunks, "
+              f"published {time.ctime(manager._meta['created'])}")
+        for name in sorted({name for name, _ in stale}): print(f"  changed since: {name}")
+        return 0
+
+    if args.command == 'refresh':
+        manager.start(background=False)
+        print(f"Snapshot v{manager.version}: {len(manager.current().chunk_files)} chunks ({manager.last_refresh[1]})")
+        return 0
+
+    manager.start()
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        manager.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Columnar, memory-mapped copy of the chunk_*.csv corpus.
+
+One-time (and incremental) conversion:
+
+    python corpus_store.py build [--force]
+    python corpus_store.py status
+
+This builds the store of the chunk files in place (.corpus_store next to them).
+The app searches the snapshots corpus_manager.py publishes, which keep a store
+of their own; a snapshot hard-links this one's files for chunks it covers.
+
+Every chunk becomes an uncompressed Arrow IPC file holding the Full_Bio column.
+Reading it back is a memory map, not a parse: the search runs the keyword regex
+straight over the decoded Arrow string buffers and only materializes the rows
+that matched. Row N in the store is row N of the CSV read the search has always
+used, so row ids line up with the inverted index. Stale or missing chunks are
+read from CSV as before.
+
+The build is also the INGEST stage: next to each bio column it writes a
+metadata table (bio_parser.META_COLUMNS: parsed header, role, football/junk
+flags, normalized keys) so searches join against it instead of re-parsing
+every hit. The table is rebuilt whenever bio_parser.PARSER_VERSION changes.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from bio_parser import META_COLUMNS, PARSER_VERSION, bio_metadata, detect_sport_batch
+
+STORE_DIR = ".corpus_store"
+MANIFEST_NAME = "manifest.json"
+STORE_VERSION = 2
+
+# Arrow's RE2 and Python re (what a search matches with) agree on an ASCII pattern, case-insensitively,
+# everywhere but at these two: Python re folds both to 'i'
+RE2_FOLD_GAP = "[\u0130\u0131]"
+
+META_SCHEMA = pa.schema([(c, pa.bool_() if c in ('is_football', 'junk') else pa.string()) for c in META_COLUMNS])
+
+
+# --- SHARED CHUNK HELPERS ---
+def read_bios(file):
+    """THE canonical CSV read of a chunk (row ids everywhere refer to this)."""
+    return pd.read_csv(file, usecols=['Full_Bio'], dtype=str, on_bad_lines='skip').fillna("")['Full_Bio']
+
+
+def file_sha1(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stamp(path):
+    st_ = os.stat(path)
+    return st_.st_mtime_ns, st_.st_size
+
+
+def load_manifest(store_dir, version):
+    try:
+        with open(os.path.join(store_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': version, 'chunks': {}}
+    if manifest.get('version') != version:
+        return {'version': version, 'chunks': {}}
+    return manifest
+
+
+def save_manifest(manifest, store_dir):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def needs_rebuild(entry, file, target_path, force=False):
+    """(rebuild?, sha1) - mtime/size first, content hash only if the stamp moved."""
+    if force or not entry or not os.path.exists(target_path):
+        return True, file_sha1(file)
+    mtime_ns, size = file_stamp(file)
+    if entry['mtime_ns'] == mtime_ns and entry['size'] == size:
+        return False, entry['sha1']
+    sha1 = file_sha1(file)
+    if entry['sha1'] == sha1:
+        # Touched but identical content: just refresh the stamp
+        entry['mtime_ns'], entry['size'] = mtime_ns, size
+        return False, sha1
+    return True, sha1
+
+
+def entry_is_fresh(entry, file):
+    if not entry: return False
+    try: mtime_ns, size = file_stamp(file)
+    except OSError: return False
+    return entry['mtime_ns'] == mtime_ns and entry['size'] == size
+
+
+# --- BUILD ---
+def _store_file(store_dir, chunk_file):
+    return os.path.join(store_dir, os.path.basename(chunk_file) + ".arrow")
+
+
+def _meta_file(store_dir, chunk_file):
+    return os.path.join(store_dir, os.path.basename(chunk_file) + ".meta.arrow")
+
+
+def write_arrow(table, path):
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def build_store(chunk_files=None, store_dir=STORE_DIR, force=False, log=print):
+    if chunk_files is None:
+        chunk_files = sorted(glob.glob("chunk_*.csv"))
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = load_manifest(store_dir, STORE_VERSION)
+    entries = manifest['chunks']
+    stats = {'built': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    for file in chunk_files:
+        key = os.path.basename(file)
+        target = _store_file(store_dir, file)
+        entry = entries.get(key)
+        # Parser rules changed -> metadata is stale even if the CSV is not
+        stale_parser = entry is not None and entry.get('parser') != PARSER_VERSION
+        rebuild, sha1 = needs_rebuild(entry, file, target, force or stale_parser)
+        if not rebuild:
+            stats['unchanged'] += 1
+            continue
+        try:
+            mtime_ns, size = file_stamp(file)
+            bios = read_bios(file)
+            write_arrow(pa.table({'Full_Bio': pa.array(bios.tolist(), type=pa.string())}), target)
+            is_football = detect_sport_batch(bios)['is_football']
+            metas = [bio_metadata(bio, bool(fb)) for bio, fb in zip(bios, is_football)]
+            write_arrow(pa.Table.from_pylist(metas, schema=META_SCHEMA), _meta_file(store_dir, file))
+        except Exception as e:
+            log(f"  ! {key}: {e}")
+            stats['failed'] += 1
+            continue
+        entries[key] = {'mtime_ns': mtime_ns, 'size': size, 'sha1': sha1, 'rows': len(bios),
+                        'parser': PARSER_VERSION}
+        stats['built'] += 1
+        log(f"  + {key}: {len(bios)} rows")
+
+    live = {os.path.basename(f) for f in chunk_files}
+    for key in [k for k in entries if k not in live]:
+        del entries[key]
+        for ext in (".arrow", ".meta.arrow"):
+            try: os.remove(os.path.join(store_dir, key + ext))
+            except OSError: pass
+        stats['removed'] += 1
+
+    save_manifest(manifest, store_dir)
+    return stats
+
+
+# --- READ ---
+class CorpusStore:
+    """Process-wide reader; memory maps are opened once per chunk version."""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self._manifest_stamp = None
+        self._manifest = {'version': STORE_VERSION, 'chunks': {}}
+        self._columns = {}  # chunk key -> (arrow file mtime_ns, ChunkedArray)
+        self._metas = {}  # chunk key -> (meta file mtime_ns, Table)
+
+    def _refresh_manifest(self):
+        try: stamp = os.stat(os.path.join(self.store_dir, MANIFEST_NAME)).st_mtime_ns
+        except OSError: stamp = None
+        if stamp != self._manifest_stamp:
+            self._manifest = load_manifest(self.store_dir, STORE_VERSION)
+            self._manifest_stamp = stamp
+            # Let go of the maps of chunks the build removed
+            live = self._manifest['chunks']
+            self._columns = {k: v for k, v in self._columns.items() if k in live}
+            self._metas = {k: v for k, v in self._metas.items() if k in live}
+
+    def is_fresh(self, chunk_file):
+        self._refresh_manifest()
+        return entry_is_fresh(self._manifest['chunks'].get(os.path.basename(chunk_file)), chunk_file)
+
+    def bio_column(self, chunk_file):
+        """Memory-mapped Full_Bio column, or None if the store can't serve this chunk."""
+        if not self.is_fresh(chunk_file): return None
+        key = os.path.basename(chunk_file)
+        path = _store_file(self.store_dir, chunk_file)
+        try: stamp = os.stat(path).st_mtime_ns
+        except OSError: return None
+        cached = self._columns.get(key)
+        if cached and cached[0] == stamp: return cached[1]
+        try:
+            column = self._map_table(path).column('Full_Bio')
+        except Exception:
+            return None
+        self._columns[key] = (stamp, column)
+        return column
+
+    def _map_table(self, path):
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+    def metadata(self, chunk_file, rows):
+        """Precomputed bio_metadata() dicts for `rows`, or None if the table can't serve them."""
+        if not self.is_fresh(chunk_file): return None
+        entry = self._manifest['chunks'].get(os.path.basename(chunk_file))
+        if entry.get('parser') != PARSER_VERSION: return None
+        key = os.path.basename(chunk_file)
+        path = _meta_file(self.store_dir, chunk_file)
+        try: stamp = os.stat(path).st_mtime_ns
+        except OSError: return None
+        cached = self._metas.get(key)
+        if cached and cached[0] == stamp:
+            table = cached[1]
+        else:
+            try: table = self._map_table(path)
+            except Exception: return None
+            self._metas[key] = (stamp, table)
+        return table.take(pa.array(rows, type=pa.int64())).to_pylist()
+
+    def bios(self, chunk_file, rows):
+        """Full_Bio text for row ids (store if fresh, CSV otherwise)."""
+        column = self.bio_column(chunk_file)
+        if column is None: return read_bios(chunk_file).loc[rows].tolist()
+        return column.take(pa.array(rows, type=pa.int64())).to_pylist()
+
+    def load(self, chunk_file):
+        """A chunk's bios for `match`: the memory-mapped column, or the CSV read if stale."""
+        column = self.bio_column(chunk_file)
+        return column if column is not None else read_bios(chunk_file)
+
+    @staticmethod
+    def match(bios, pattern, rows=None):
+        """Bios from `load` matching `pattern` (case-insensitive regex) as a Series indexed by row id.
+
+        `rows` restricts the scan to candidate row ids (e.g. from the inverted index). Matches are
+        Python re's: RE2 scans the Arrow column, and the bios it may judge differently (see
+        RE2_FOLD_GAP; all of them for a non-ASCII pattern) are matched again with re.
+        """
+        if isinstance(bios, pd.Series):
+            if rows is not None: bios = bios.loc[rows]
+            # flags= keeps pandas on re (it would hand an Arrow-backed column to RE2)
+            return bios[bios.str.contains(pattern, flags=re.IGNORECASE, na=False, regex=True)]
+
+        row_ids = pa.array(rows if rows is not None else range(len(bios)), type=pa.int64())
+        if rows is not None: bios = bios.take(row_ids)
+        if pattern.isascii():
+            mask = pc.match_substring_regex(bios, pattern, ignore_case=True).fill_null(False)
+            redo = pc.match_substring_regex(bios, RE2_FOLD_GAP).fill_null(False)
+            redo = np.flatnonzero(redo.to_numpy(zero_copy_only=False))
+        else:
+            mask, redo = pa.array(np.zeros(len(bios), dtype=bool)), np.arange(len(bios))
+        if len(redo):
+            regex = re.compile(pattern, re.IGNORECASE)
+            mask = np.array(mask.to_numpy(zero_copy_only=False))
+            mask[redo] = [bio is not None and regex.search(bio) is not None for bio in bios.take(redo).to_pylist()]
+            mask = pa.array(mask)
+        hits = pc.filter(row_ids, mask).to_pylist()
+        return pd.Series(pc.filter(bios, mask).to_pylist(), index=hits, dtype=str, name='Full_Bio')
+
+    def scan(self, chunk_file, pattern, rows=None):
+        """load() + match() in one call."""
+        return self.match(self.load(chunk_file), pattern, rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert chunk_*.csv into the memory-mapped Arrow store")
+    parser.add_argument('command', choices=['build', 'status'])
+    parser.add_argument('--store-dir', default=STORE_DIR)
+    parser.add_argument('--force', action='store_true', help="re-convert every chunk")
+    args = parser.parse_args(argv)
+
+    chunk_files = sorted(glob.glob("chunk_*.csv"))
+    if args.command == 'build':
+        stats = build_store(chunk_files, args.store_dir, force=args.force)
+        print(f"Store: {stats['built']} built, {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['failed']} failed")
+        return 1 if stats['failed'] else 0
+
+    store = CorpusStore(args.store_dir)
+    stale = [f for f in chunk_files if not store.is_fresh(f)]
+    print(f"{len(chunk_files) - len(stale)}/{len(chunk_files)} chunks in store and fresh")
+    for f in stale: print(f"  stale: {f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
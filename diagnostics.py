@@ -0,0 +1,104 @@
+"""Search instrumentation: stage timings, row counters, skipped chunks, structured logs.
+
+`StageStats` is filled in by search_chunk (in whichever worker runs it) and
+shipped back with the hits. `SearchDiagnostics` merges those for one search,
+adds the stages that run in the app process, remembers every chunk that was
+skipped and why, and emits the whole thing as one JSON log line
+(logger "recruiting.search"). The app shows the same record in its
+diagnostics panel.
+
+Log level: RECRUITING_LOG_LEVEL (default INFO). Lines go to stderr unless the
+host process has configured logging itself.
+"""
+import contextlib
+import json
+import logging
+import os
+import time
+
+LOG_LEVEL = os.environ.get("RECRUITING_LOG_LEVEL", "INFO").upper()
+
+# Stages in pipeline order (display + log order)
+STAGES = ['index', 'read', 'match', 'metadata', 'parse_header', 'detect_sport', 'snippet',
+          'contact_match', 'dedupe_sort', 'export']
+COUNTERS = ['rows_scanned', 'rows_matched', 'rows_kept', 'chunks_unindexed', 'chunks_csv']
+
+
+def get_logger(name):
+    logger = logging.getLogger(f"recruiting.{name}")
+    root = logging.getLogger("recruiting")
+    if not root.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+    return logger
+
+
+def log_event(logger, event, level=logging.INFO, **fields):
+    """One structured log line: a JSON object with an 'event' field."""
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({'event': event, **fields}, default=str, sort_keys=False))
+
+
+class StageStats(dict):
+    """Seconds per pipeline stage plus row counters. A plain dict, so it pickles back from workers."""
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try: yield
+        finally: self.add(stage, time.perf_counter() - start)
+
+    def add(self, key, value):
+        self[key] = self.get(key, 0) + value
+
+    def merge(self, other):
+        for key, value in other.items(): self.add(key, value)
+        return self
+
+
+class SearchDiagnostics:
+    """Everything measured during ONE search (see module docstring)."""
+
+    def __init__(self, keywords, chunks):
+        self.keywords = list(keywords)
+        self.chunks = chunks
+        self.searched = []  # keywords that needed a corpus pass (the rest came from cache)
+        self.stats = StageStats()
+        self.skipped = []  # (chunk file, reason)
+        self.max_hits = 0  # per-keyword cap (0 = none)
+        self.capped = []  # keywords that hit it
+        self.cancelled = False
+        self.fuzzy = {}  # typed keyword -> extra variants searched (fuzzy mode)
+        self.wall = 0.0
+        self._start = time.perf_counter()
+
+    def chunk_done(self, file, stats, error=None):
+        if stats: self.stats.merge(stats)
+        if error is not None:
+            self.skipped.append((file, error))
+            log_event(get_logger("search"), "chunk_skipped", logging.WARNING, chunk=file, reason=error)
+
+    def finish(self, results=None):
+        self.wall = time.perf_counter() - self._start
+        self.results = {kw: len(df) for kw, df in (results or {}).items()}
+        log_event(get_logger("search"), "search", **self.as_dict())
+        return self
+
+    def as_dict(self):
+        return {
+            'keywords': self.keywords,
+            'searched': self.searched,
+            'cached': [kw for kw in self.keywords if kw not in self.searched],
+            'chunks': self.chunks,
+            'wall_seconds': round(self.wall, 4),
+            'stage_seconds': {s: round(self.stats[s], 4) for s in STAGES if s in self.stats},
+            'rows': {c: self.stats.get(c, 0) for c in COUNTERS},
+            'skipped': [{'chunk': f, 'reason': r} for f, r in self.skipped],
+            'max_hits': self.max_hits,
+            'capped': self.capped,
+            'cancelled': self.cancelled,
+            'fuzzy': self.fuzzy,
+            'results': getattr(self, 'results', {}),
+        }
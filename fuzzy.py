@@ -0,0 +1,190 @@
+"""Fuzzy (typo / abbreviation tolerant) keyword search.
+
+Fuzzy mode does not change the search itself. Each keyword is EXPANDED into a
+few concrete spellings, those run through the normal exact single pass (index,
+result cache and all), and their hits are folded back under the keyword that
+was typed, best match first:
+
+    'Tallahasee'  -> Tallahasee, tallahassee          (typo: corpus vocabulary)
+    'St. Louis'   -> St. Louis, st louis, saint louis (SYNONYM_GROUPS)
+    'FSU'         -> FSU, florida state               (SCHOOL_ALIASES)
+
+Variants of several words are bio_parser.Phrases: any punctuation may sit
+between the words, so 'saint louis' -> 'st louis' also finds 'St. Louis' and
+'Miami' -> 'miami fl' finds 'Miami (FL)'.
+
+Near-miss spellings come from the index vocabulary (search_index.py build):
+the trigram map narrows the whole vocabulary to the few tokens sharing enough
+trigrams with the typed one, and only those get an edit-distance check.
+Without a built index only the synonym tables apply.
+
+Extra synonym groups: RECRUITING_SYNONYMS_FILE, a JSON list of lists
+(e.g. [["umass", "massachusetts"], ["a&m", "a and m"]]).
+"""
+import bisect
+import functools
+import itertools
+import json
+import os
+from collections import Counter
+
+import pandas as pd
+
+from bio_parser import SCHOOL_ALIASES, Phrase
+from search_index import tokenize, trigrams
+
+# Spellings that mean the same thing (matched as whole tokens / phrases, both ways)
+SYNONYM_GROUPS = [
+    ["st", "saint"], ["ft", "fort"], ["mt", "mount"], ["univ", "university"],
+    ["hs", "high school"], ["jr", "junior"], ["sr", "senior"], ["fr", "freshman"], ["so", "sophomore"],
+    ["qb", "quarterback"], ["rb", "running back"], ["wr", "wide receiver"], ["te", "tight end"],
+    ["ol", "offensive line", "offensive lineman"], ["dl", "defensive line", "defensive lineman"],
+    ["lb", "linebacker"], ["db", "defensive back"], ["cb", "cornerback"],
+    ["oc", "offensive coordinator"], ["dc", "defensive coordinator"], ["hc", "head coach"],
+    ["ga", "graduate assistant"],
+]
+SYNONYMS_FILE = os.environ.get("RECRUITING_SYNONYMS_FILE")
+
+SYNONYM_SIMILARITY = 0.9
+# Variants are substring matches: shorter ones ('so', 'te') would match nearly every bio
+MIN_VARIANT_CHARS = 4
+MAX_VARIANTS = 8  # per keyword, the typed keyword included
+MAX_TERMS_PER_TOKEN = 3  # near-miss spellings tried per token
+# A token the corpus has is corrected only to near misses at least this many times more common
+CORRECTION_DF_RATIO = 10
+
+
+def max_edits(token):
+    """Typos tolerated in a token: none for short words and numbers."""
+    if token.isdigit() or len(token) <= 4: return 0
+    return 1 if len(token) <= 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """Edit distance (adjacent swaps count as one), or limit + 1 once it is certainly above `limit`."""
+    if abs(len(a) - len(b)) > limit: return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit: return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def similarity(a, b, distance):
+    return 1 - distance / max(len(a), len(b))
+
+
+@functools.lru_cache(maxsize=1)
+def synonyms():
+    """Normalized phrase -> the other spellings in its group(s)."""
+    groups = [list(g) for g in SYNONYM_GROUPS]
+    groups += [[alias, real] for alias, real in SCHOOL_ALIASES.items()]
+    if SYNONYMS_FILE:
+        with open(SYNONYMS_FILE, encoding='utf-8') as f:
+            groups += json.load(f)
+    table = {}
+    for group in groups:
+        phrases = [" ".join(tokenize(p)) for p in group]
+        for phrase in phrases:
+            table.setdefault(phrase, []).extend(p for p in phrases if p != phrase and p not in table[phrase])
+    return table
+
+
+class Vocabulary:
+    """Near-miss lookup over the index vocabulary (tokens, document frequencies, trigram map)."""
+
+    def __init__(self, vocab):
+        self.tokens, self.df, self.grams = vocab['tokens'], vocab['df'], vocab['grams']
+
+    def __contains__(self, token):
+        return self.frequency(token) > 0
+
+    def frequency(self, token):
+        """Document frequency of a token (0 if the corpus doesn't have it)."""
+        i = bisect.bisect_left(self.tokens, token)
+        return self.df[i] if i < len(self.tokens) and self.tokens[i] == token else 0
+
+    def similar(self, token, limit, min_df=1):
+        """[(vocab token, similarity)] within `limit` edits in at least `min_df` documents,
+        best (then most common) first."""
+        if not limit: return []
+        grams = trigrams(token)
+        # One edit breaks at most 4 padded trigrams (an adjacent swap: 'hosuton' shares only '$ho', 'ton', 'on$'
+        # of 'houston'), so a match shares at least this many
+        need = max(1, len(grams) - 4 * limit)
+        shared = Counter(itertools.chain.from_iterable(self.grams.get(g, ()) for g in grams))
+        found = []
+        for i, count in shared.items():
+            if count < need or self.df[i] < min_df: continue
+            other = self.tokens[i]
+            distance = edit_distance(token, other, limit)
+            if 0 < distance <= limit: found.append((other, similarity(token, other, distance), self.df[i]))
+        found.sort(key=lambda f: (-f[1], -f[2], f[0]))
+        return [(other, sim) for other, sim, _ in found]
+
+
+def token_options(token, vocab=None):
+    """[(spelling, similarity)] one token of a keyword can take."""
+    options = [(token, 1.0)] + [(s, SYNONYM_SIMILARITY) for s in synonyms().get(token, ())]
+    if vocab is not None:
+        # A token the corpus has is corrected only to far more common spellings: 'tallahasee' (a typo
+        # in 2 bios) -> 'tallahassee' (in 40), but 'texas' is a word, not a typo of 'texan'
+        min_df = CORRECTION_DF_RATIO * vocab.frequency(token) or 1
+        options += vocab.similar(token, max_edits(token), min_df)[:MAX_TERMS_PER_TOKEN]
+    return options
+
+
+def fuzzy_variants(keyword, vocab=None):
+    """[(variant, similarity)] for ONE keyword: the keyword itself first, then the best alternatives."""
+    variants = {keyword.lower(): (keyword, 1.0)}
+
+    def add(words, sim):
+        if len(words) < MIN_VARIANT_CHARS: return
+        text = Phrase(words) if " " in words else words
+        old = variants.get(words)
+        # A Phrase also replaces the same words typed literally: it finds everything they find
+        if old is None or old[1] < sim or (old[1] == sim and isinstance(text, Phrase) and not isinstance(old[0], Phrase)):
+            variants[words] = (text, sim)
+
+    toks = tokenize(keyword)
+    if not toks: return [(keyword, 1.0)]
+    phrase = " ".join(toks)
+    add(phrase, 1.0)  # 'St. Louis' also as the Phrase 'st louis'
+    for other in synonyms().get(phrase, ()): add(other, SYNONYM_SIMILARITY)
+    for combo in itertools.product(*(token_options(tok, vocab) for tok in toks)):
+        sim = 1.0
+        for _, s in combo: sim *= s
+        add(" ".join(t for t, _ in combo), sim)
+    return sorted(variants.values(), key=lambda v: -v[1])[:MAX_VARIANTS]
+
+
+def fuzzy_plan(keywords, vocab=None):
+    """{typed keyword: [(variant, similarity)]}; `vocab` is SearchIndex.vocabulary() (may be None)."""
+    vocab = Vocabulary(vocab) if vocab else None
+    return {kw: fuzzy_variants(kw, vocab) for kw in keywords}
+
+
+def fold_results(results, plan, max_hits=0):
+    """Per-variant frames -> one frame per typed keyword, ranked by similarity.
+
+    A person found by several variants keeps the best one; rows carry the
+    variant that matched (Match) and its Similarity. The index stays file order.
+    """
+    folded = {}
+    for kw, variants in plan.items():
+        frames = [results[v].assign(Match=v, Similarity=round(sim, 2)) for v, sim in variants if v in results]
+        if not frames: continue
+        df = pd.concat(frames, ignore_index=True)
+        df = df.drop_duplicates(subset=['Name', 'School'])  # variants are in similarity order
+        # Renumber in FILE order across the variants: top_k ties and cap_frame read the index
+        df = df.sort_values(by=['Chunk', 'Row'], key=lambda col: col.astype(str) if col.name == 'Chunk' else col,
+                            kind='stable', ignore_index=True)
+        df = df.sort_values(by=['Similarity', 'Role', 'School', 'Name'], ascending=[False, True, True, True],
+                            kind='stable')
+        folded[kw] = df.head(max_hits) if max_hits else df
+    return folded
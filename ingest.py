@@ -0,0 +1,244 @@
+"""Ingestion: raw scraped bio CSVs -> deduplicated, normalized, size-bounded chunk_*.csv.
+
+    python ingest.py raw/ [more raw dirs or files] --out corpus/ [--build]
+    python ingest.py raw/ --out corpus/ --max-rows 1000 --max-mb 16 --drop-junk
+
+Raw files are the scraper's CSVs (any *.csv with a Full_Bio column; Name /
+Title / School usually say "Unknown"). They are streamed in blocks, never
+loaded whole. Every bio is keyed by its SOURCE URL (normalized) or, if it has
+none, by a hash of its text; a key seen before - earlier in this run or in any
+earlier run - is dropped, first one wins (the same rule as the search's file
+order). Name / Title / School are filled in from the parsed header, and a
+Source column records the URL.
+
+Survivors are appended to output chunks of at most --max-rows rows and
+--max-mb MB: the last, partly filled chunk is topped up, then new chunks are
+started. Older output chunks are never touched, so the corpus store and
+search index only rebuild what changed (--build runs both afterwards).
+
+State lives in <out>/.ingest/manifest.json: the dedupe keys, the raw files
+already read (mtime/size/sha1 - unchanged files are skipped) and the row
+count of every output chunk.
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import os
+import re
+import sys
+from urllib.parse import urlsplit, urlunsplit
+
+import pandas as pd
+
+from bio_parser import bio_metadata, detect_sport_batch
+from corpus_store import file_sha1, file_stamp, load_manifest, save_manifest
+
+INGEST_DIR = ".ingest"
+INGEST_VERSION = 1
+OUTPUT_COLUMNS = ['Name', 'Title', 'School', 'Source', 'Full_Bio']
+
+# Output chunk bounds: big enough that per-chunk overhead (file open, index
+# lookup, contact join) stays small, small enough to spread over the workers
+MAX_CHUNK_ROWS = int(os.environ.get("RECRUITING_CHUNK_ROWS", "1000"))
+MAX_CHUNK_MB = float(os.environ.get("RECRUITING_CHUNK_MB", "16"))
+# Raw rows parsed per block
+READ_BLOCK_ROWS = 2000
+
+SOURCE_RE = re.compile(r'^\s*SOURCE:\s*(\S+)', re.IGNORECASE)
+
+
+# --- DEDUPE KEYS ---
+def source_url(bio):
+    """The SOURCE URL from a bio's first line, or None."""
+    match = SOURCE_RE.match(bio)
+    return match.group(1) if match else None
+
+
+def normalize_url(url):
+    """Same page, same key: lowercase scheme/host, no fragment, no trailing slash."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def dedupe_key(bio, url=None):
+    """Short hash of the normalized SOURCE URL, or of the bio text when there is none."""
+    basis = "url:" + normalize_url(url) if url else "text:" + bio.strip()
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()[:16]
+
+
+def _known(value):
+    return isinstance(value, str) and value.strip() and value.strip() != "Unknown"
+
+
+# --- OUTPUT ---
+class ChunkWriter:
+    """Appends rows to chunk_NNNNN.csv files, starting a new one at the row / byte bound."""
+
+    def __init__(self, out_dir, entries, max_rows=MAX_CHUNK_ROWS, max_bytes=MAX_CHUNK_MB * 2**20):
+        self.out_dir = out_dir
+        self.entries = entries  # chunk name -> {'rows': n}
+        self.max_rows, self.max_bytes = max_rows, max_bytes
+        self.touched = []  # chunks written this run (new or topped up)
+        self._file = self._writer = None
+        self._name, self._rows = None, 0
+
+    def _path(self, name):
+        return os.path.join(self.out_dir, name)
+
+    def _open(self):
+        # Top up the newest chunk if it still has room, otherwise start the next one
+        last = max(self.entries, default=None)
+        if last and self._name is None and self.entries[last]['rows'] < self.max_rows \
+                and os.path.exists(self._path(last)) and os.path.getsize(self._path(last)) < self.max_bytes:
+            self._name, self._rows = last, self.entries[last]['rows']
+        else:
+            n = len(self.entries) + 1
+            while os.path.exists(self._path(f"chunk_{n:05d}.csv")): n += 1
+            self._name, self._rows = f"chunk_{n:05d}.csv", 0
+        new = self._rows == 0
+        self._file = open(self._path(self._name), 'w' if new else 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file, lineterminator='\n')
+        if new: self._writer.writerow(OUTPUT_COLUMNS)
+        self.entries[self._name] = {'rows': self._rows}
+        self.touched.append(self._name)
+
+    def write(self, row):
+        if self._file is None: self._open()
+        self._writer.writerow(row)
+        self._rows += 1
+        self.entries[self._name]['rows'] = self._rows
+        if self._rows >= self.max_rows or self._file.tell() >= self.max_bytes:
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._writer = None
+
+
+# --- INGEST ---
+def iter_raw_blocks(path, block_rows=READ_BLOCK_ROWS):
+    """(Name, Title, School, Full_Bio) blocks of a raw CSV; missing columns read as Unknown."""
+    for block in pd.read_csv(path, dtype=str, on_bad_lines='skip', chunksize=block_rows):
+        if 'Full_Bio' not in block.columns: raise ValueError("no Full_Bio column")
+        for col in ('Name', 'Title', 'School'):
+            if col not in block.columns: block[col] = "Unknown"
+        block['Full_Bio'] = block['Full_Bio'].fillna("").astype(object)
+        yield block[['Name', 'Title', 'School', 'Full_Bio']]
+
+
+def ingest_block(block, keys, writer, stats, drop_junk=False):
+    urls = [source_url(bio) for bio in block['Full_Bio']]
+    fresh = []
+    for pos, (bio, url) in enumerate(zip(block['Full_Bio'], urls)):
+        if not bio.strip():
+            stats['empty'] += 1
+            continue
+        key = dedupe_key(bio, url)
+        if key in keys:
+            stats['duplicates'] += 1
+            continue
+        keys.add(key)
+        fresh.append(pos)
+    if not fresh: return
+
+    block = block.iloc[fresh]
+    is_football = detect_sport_batch(block['Full_Bio'])['is_football']
+    for (name, title, school, bio), url, football in zip(block.itertuples(index=False, name=None),
+                                                          [urls[p] for p in fresh], is_football):
+        meta = bio_metadata(bio, bool(football))
+        if drop_junk and (meta['junk'] or not meta['is_football']):
+            stats['junk'] += 1
+            continue
+        writer.write([
+            name if _known(name) else meta['Name'],
+            title if _known(title) else meta['Title'],
+            school if _known(school) else meta['School'],
+            url or "",
+            bio,
+        ])
+        stats['written'] += 1
+
+
+def list_raw_files(sources):
+    files = []
+    for source in sources:
+        files += sorted(glob.glob(os.path.join(source, "*.csv"))) if os.path.isdir(source) else [source]
+    return [os.path.abspath(f) for f in files]
+
+
+def ingest(sources, out_dir=".", max_rows=MAX_CHUNK_ROWS, max_mb=MAX_CHUNK_MB, drop_junk=False, log=print):
+    """Stream raw files into out_dir's chunks -> (stats, chunk files written)."""
+    state_dir = os.path.join(out_dir, INGEST_DIR)
+    os.makedirs(state_dir, exist_ok=True)
+    manifest = load_manifest(state_dir, INGEST_VERSION)
+    raw_entries = manifest.setdefault('raw', {})
+    keys = set(manifest.setdefault('keys', []))
+    writer = ChunkWriter(out_dir, manifest['chunks'], max_rows, max_mb * 2**20)
+    stats = {'files': 0, 'unchanged': 0, 'failed': 0, 'rows': 0, 'empty': 0, 'duplicates': 0, 'junk': 0,
+             'written': 0}
+
+    own = {os.path.abspath(os.path.join(out_dir, name)) for name in manifest['chunks']}
+    try:
+        for path in list_raw_files(sources):
+            if path in own: continue  # our own output
+            entry = raw_entries.get(path)
+            mtime_ns, size = file_stamp(path)
+            if entry and (entry['mtime_ns'], entry['size']) == (mtime_ns, size):
+                stats['unchanged'] += 1
+                continue
+            sha1 = file_sha1(path)
+            if entry and entry['sha1'] == sha1:
+                entry['mtime_ns'], entry['size'] = mtime_ns, size
+                stats['unchanged'] += 1
+                continue
+            before = stats['written']
+            try:
+                for block in iter_raw_blocks(path):
+                    stats['rows'] += len(block)
+                    ingest_block(block, keys, writer, stats, drop_junk)
+            except Exception as e:
+                # Rows already written stay (their keys are recorded); a fixed file re-ingests the rest
+                log(f"  ! {os.path.basename(path)}: {e}")
+                stats['failed'] += 1
+                continue
+            raw_entries[path] = {'mtime_ns': mtime_ns, 'size': size, 'sha1': sha1}
+            stats['files'] += 1
+            log(f"  + {os.path.basename(path)}: {stats['written'] - before} new rows")
+    finally:
+        writer.close()
+        manifest['keys'] = sorted(keys)
+        save_manifest(manifest, state_dir)
+    return stats, [os.path.join(out_dir, name) for name in dict.fromkeys(writer.touched)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest raw scraped bio CSVs into deduplicated chunk_*.csv files")
+    parser.add_argument('sources', nargs='+', help="raw CSV files or directories of them")
+    parser.add_argument('--out', default=".", help="corpus directory the chunks are written to (default: current)")
+    parser.add_argument('--max-rows', type=int, default=MAX_CHUNK_ROWS, help="rows per output chunk")
+    parser.add_argument('--max-mb', type=float, default=MAX_CHUNK_MB, help="size bound per output chunk")
+    parser.add_argument('--drop-junk', action='store_true',
+                        help="also drop rows the current parser rejects (junk / non-football); re-ingest if rules change")
+    parser.add_argument('--build', action='store_true', help="update the corpus store and search index afterwards")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    stats, written = ingest(args.sources, args.out, args.max_rows, args.max_mb, args.drop_junk)
+    print(f"Ingest: {stats['files']} files read ({stats['unchanged']} unchanged, {stats['failed']} failed), "
+          f"{stats['rows']} rows -> {stats['written']} written, {stats['duplicates']} duplicates, "
+          f"{stats['empty']} empty, {stats['junk']} junk; {len(written)} chunks written")
+
+    if args.build and written:
+        from corpus_store import build_store
+        from search_index import build_index
+        os.chdir(args.out)  # store and index dirs are relative to the corpus
+        build_store()
+        build_index()
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,413 @@
+"""Coach master database: loading, column detection and batch contact matching.
+
+The sheet is normalized column-wise into one records frame, and three keyed
+views map keys to its rows (exact school+name, global name, school+last name).
+`MasterLookup.match` joins a whole batch of search hits against those views
+with the v1.13 precedence (exact -> global -> fuzzy) and the player
+protection rule.
+
+`MasterSource` is what the app uses: it serves immediately from a versioned
+local snapshot (Arrow IPC of the records frame) and refreshes from the sheet
+on a background thread with conditional requests (ETag / Last-Modified),
+swapping the lookup atomically when new data arrives. Point it at a local
+HTTP stand-in with RECRUITING_MASTER_URL.
+"""
+import glob
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import requests
+
+from bio_parser import SCHOOL_ALIASES
+
+GOOGLE_SHEET_CSV_URL = "https://docs.google.com/spreadsheets/d/18kLsLZVPYehzEjlkZMTn0NP0PitRonCKXyjGCRjLmms/export?format=csv&gid=1572560106"
+
+CONTACT_FIELDS = ['email', 'twitter', 'title', 'school', 'name']
+# Few distinct values, repeated on every coach's row: stored once as categoricals
+CATEGORY_FIELDS = ['title', 'school']
+JUNK_CONTACT_VALUES = ['x', 'y', 'yes', 'no', '-']
+NORMALIZE_DROP_WORDS = ['university', 'univ', 'college', 'the', 'of', 'athletics', 'inst']
+
+MASTER_URL = os.environ.get("RECRUITING_MASTER_URL", GOOGLE_SHEET_CSV_URL)
+SNAPSHOT_DIR = ".master_snapshot"
+SNAPSHOT_FORMAT = 1
+REFRESH_INTERVAL = int(os.environ.get("RECRUITING_MASTER_REFRESH_SECS", "900"))
+
+
+# --- LOADING ---
+def read_local_master():
+    """A local *master*.csv, or None."""
+    possible_files = glob.glob("*master*.csv") + glob.glob("*MASTER*.csv")
+    if not possible_files: return None
+    try: return pd.read_csv(possible_files[0], encoding='utf-8')
+    except:
+        try: return pd.read_csv(possible_files[0], encoding='latin1')
+        except: return None
+
+
+def fetch_master_frame(url=None, timeout=3):
+    """Raw sheet: Google export first, then a local *master*.csv. None if neither works."""
+    df = None
+    try:
+        r = requests.get(url or MASTER_URL, timeout=timeout)
+        if r.ok:
+            df = pd.read_csv(io.BytesIO(r.content), encoding='utf-8')
+    except: pass
+
+    if df is None or df.empty:
+        df = read_local_master()
+
+    if df is None or df.empty: return None
+    return df
+
+
+# --- SMART COLUMN FINDER ---
+def get_smart_col(df, keywords, data_type='text', bad_words=None):
+    if bad_words is None: bad_words = []
+    candidates = []
+    for col in df.columns:
+        c_lower = str(col).lower().strip()
+        if any(k in c_lower for k in keywords):
+            candidates.append(col)
+
+    if not candidates: return None
+
+    best_col = None
+    max_score = -9999
+
+    for col in candidates:
+        score = 0
+        col_lower = str(col).lower()
+        if any(bad in col_lower for bad in ['sent', 'verify', 'check', 'status', 'date', 'time']): score -= 100
+        if any(bad in col_lower for bad in bad_words): score -= 100
+        if "individual" in col_lower or "personal" in col_lower or "coach" in col_lower: score += 50
+        if col_lower in keywords: score += 10
+
+        sample = df[col].dropna().astype(str).head(100).tolist()
+        if not sample: score -= 10
+        else:
+            valid_count = 0
+            for val in sample:
+                v = val.strip().lower()
+                if v in ['x', 'y', 'n', 'yes', 'no', 'true', 'false', 'done']: valid_count -= 1
+                elif data_type == 'email' and '@' in v: valid_count += 2
+                elif data_type == 'twitter' and len(v) > 2: valid_count += 1
+            score += valid_count
+
+        if score > max_score:
+            max_score = score
+            best_col = col
+
+    return best_col
+
+
+def find_columns(df):
+    """TEAM PHOBIC COLUMN DETECTION: sheet column for each contact field (or None)."""
+    return {
+        'school': get_smart_col(df, ['school', 'institution']),
+        'first': get_smart_col(df, ['first name', 'first']),
+        'last': get_smart_col(df, ['last name', 'last']),
+        'email': get_smart_col(df, ['email', 'e-mail', 'mail'], 'email'),
+        'twitter': get_smart_col(df, ["individual's twitter", "twitter", "x.com", "social"], 'twitter', bad_words=['team', 'general', 'program', 'athletics']),
+        'title': get_smart_col(df, ['title', 'position', 'role']),
+    }
+
+
+# --- COLUMN-WISE NORMALIZATION ---
+def normalize_series(s):
+    """normalize_text_v1_26() for a whole column (missing -> "")."""
+    s = s.astype(object)
+    missing = s.isna()
+    s = s.where(~missing, "").map(str).astype(object)  # object dtype = Python str semantics
+    s = s.str.lower().str.replace('.', '', regex=False).str.replace("'", "", regex=False).str.strip()
+    # Explicitly remove 'athletics'
+    for word in NORMALIZE_DROP_WORDS:
+        s = s.str.replace(word, '', regex=False)
+    return s.str.replace(r'[^a-z0-9]', '', regex=True).str.strip()
+
+
+def _clean_column(df, col):
+    """str(value).strip(), "" for a missing column or missing value."""
+    if not col: return pd.Series("", index=df.index, dtype=object)
+    s = df[col].astype(object)
+    return s.where(s.notna(), "").map(str).astype(object).str.strip()
+
+
+def _resolve_alias(raw_school):
+    for alias, real in SCHOOL_ALIASES.items():
+        if alias.lower() == raw_school.lower(): raw_school = real
+    return raw_school
+
+
+def build_records(df):
+    """One row per coach with a name: contact fields + normalized keys."""
+    cols = find_columns(df)
+
+    # Alias mapping: resolve each DISTINCT school once, then map the column
+    raw_school = _clean_column(df, cols['school'])
+    raw_school = raw_school.map({s: _resolve_alias(s) for s in raw_school.unique()})
+
+    # --- HANDLE SPLIT OR SINGLE COLUMNS ---
+    first = _clean_column(df, cols['first'])
+    last = _clean_column(df, cols['last'])
+    full_name = (first + " " + last).str.strip().where((first != "") & (last != ""), first.where(first != "", last))
+
+    email = _clean_column(df, cols['email'])
+    twitter = _clean_column(df, cols['twitter'])
+    # Clean junk data
+    email = email.where(~email.str.lower().isin(JUNK_CONTACT_VALUES), "")
+    twitter = twitter.where(~twitter.str.lower().isin(JUNK_CONTACT_VALUES), "")
+
+    records = pd.DataFrame({
+        'email': email, 'twitter': twitter, 'title': _clean_column(df, cols['title']),
+        'school': raw_school, 'name': full_name,
+        's_key': normalize_series(raw_school), 'n_key': normalize_series(full_name), 'l_key': normalize_series(last),
+    })
+    return records[records['name'] != ""].reset_index(drop=True)
+
+
+# --- MATCHING ---
+class MasterLookup:
+    """Keyed views over the master records, joined against search hits in batches.
+
+    The contact data exists ONCE (the records frame, repeated school / title
+    values as categoricals); each view maps its key to a row position.
+    """
+
+    def __init__(self, records, status="Success"):
+        self.status = status
+        self.generation = 0  # set by MasterSource when published; keys result caches
+        records = compact_records(records).assign(pos=range(len(records)))
+        # Later rows overwrite earlier ones for exact keys; first row wins for name / last name
+        self.exact = (records[records['s_key'] != ""]
+                      .drop_duplicates(['s_key', 'n_key'], keep='last').set_index(['s_key', 'n_key'])['pos'])
+        self.by_name = records.drop_duplicates('n_key', keep='first').set_index('n_key')['pos']
+        self.by_last = (records[records['l_key'].str.len() > 3]
+                        .drop_duplicates(['s_key', 'l_key'], keep='first').set_index(['s_key', 'l_key'])['pos'])
+        self.records = records[CONTACT_FIELDS]  # the keys live on in the views
+
+    @classmethod
+    def empty(cls, status="Failed"):
+        return cls(pd.DataFrame(columns=CONTACT_FIELDS + ['s_key', 'n_key', 'l_key'], dtype=object), status)
+
+    def __len__(self):
+        return len(self.records)
+
+    def match(self, hits):
+        """Contact data for a frame of hits (bio_metadata columns) -> result columns, same index.
+
+        Returns Role, Name, Title, School, Email, Twitter with coach data applied,
+        and Match_Source: which view supplied it ('exact', 'global', 'fuzzy' or '').
+        """
+        if hits.empty:
+            return pd.DataFrame(columns=['Role', 'Name', 'Title', 'School', 'Email', 'Twitter', 'Match_Source'],
+                                index=hits.index)
+
+        exact = self.exact.reindex(pd.MultiIndex.from_arrays([hits['s_key'], hits['n_key']])).to_numpy(float)
+        glob_ = self.by_name.reindex(hits['n_key']).to_numpy(float)
+        fuzzy = self.by_last.reindex(pd.MultiIndex.from_arrays([hits['s_key'], hits['l_key']])).to_numpy(float)
+
+        # --- v1.13 MATCHING LOGIC: exact -> global -> fuzzy ---
+        is_exact = ~np.isnan(exact)
+        pos = np.where(is_exact, exact, np.where(~np.isnan(glob_), glob_, fuzzy))
+
+        # --- PLAYER PROTECTION PROTOCOL ---
+        pos[~is_exact & (hits['Role'] == 'PLAYER').to_numpy()] = np.nan
+        found = ~np.isnan(pos)
+        source = np.select([is_exact, found & ~np.isnan(glob_), found], ['exact', 'global', 'fuzzy'], '')
+        match = pd.DataFrame("", index=hits.index, columns=CONTACT_FIELDS, dtype=object)
+        if found.any():
+            rows = self.records[CONTACT_FIELDS].iloc[pos[found].astype(np.int64)]
+            match.loc[found] = rows.astype(object).to_numpy()
+
+        # Apply Coach Data
+        has_contact = (match['twitter'].str.len() > 3) | (match['email'].str.len() > 3)
+        role = hits['Role'].where(~has_contact, 'COACH/STAFF')
+
+        return pd.DataFrame({
+            'Role': role,
+            'Name': hits['Name'],
+            'Title': match['title'].where(match['title'] != "", hits['Title']),
+            'School': match['school'].where(match['school'] != "", hits['School']),
+            'Email': match['email'],
+            'Twitter': match['twitter'],
+            'Match_Source': source,
+        }, index=hits.index)
+
+
+def compact_records(records):
+    """Records with a 0..n-1 index, repeated values as categoricals and the rest as Arrow strings.
+
+    Arrow-backed columns keep the text in one buffer instead of a Python object per value.
+    """
+    records = records.reset_index(drop=True)
+    return records.astype({col: 'category' if col in CATEGORY_FIELDS else 'str' for col in records})
+
+
+def load_master_lookup(url=None):
+    """Blocking load (batch tools). The app uses MasterSource instead."""
+    df = fetch_master_frame(url)
+    if df is None: return MasterLookup.empty("Failed")
+    return MasterLookup(build_records(df), "Success")
+
+
+# --- SNAPSHOT + BACKGROUND REFRESH ---
+class MasterSource:
+    """Never blocks on the network: snapshot first, sheet refresh in the background.
+
+    `current()` always returns a complete MasterLookup; a refresh builds the new
+    one off to the side and swaps the reference in one assignment, so readers
+    never see a half-built lookup. Status is "Pending" until the first data
+    arrives and "Failed" if the first refresh also came back empty-handed.
+    """
+
+    def __init__(self, url=None, snapshot_dir=SNAPSHOT_DIR, refresh_interval=REFRESH_INTERVAL, timeout=10):
+        self.url = url or MASTER_URL
+        self.snapshot_dir = snapshot_dir
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.last_error = None
+        self.last_refresh = None  # (time, outcome)
+        self._generation = 0
+        self._lookup = MasterLookup.empty("Pending")
+        self._meta = {}
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        return self._lookup
+
+    @property
+    def version(self):
+        return self._meta.get('version', 0)
+
+    # --- snapshot ---
+    def _meta_path(self):
+        return os.path.join(self.snapshot_dir, "snapshot.json")
+
+    def load_snapshot(self):
+        """Local snapshot -> lookup. False if there is none (or it is unreadable)."""
+        try:
+            with open(self._meta_path(), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('format') != SNAPSHOT_FORMAT: return False
+            table = pa.ipc.open_file(pa.memory_map(os.path.join(self.snapshot_dir, meta['file']), 'r')).read_all()
+            records = table.to_pandas().astype(object)
+        except Exception:
+            return False
+        self._swap(records, meta)
+        return True
+
+    def _write_snapshot(self, records, meta):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = os.path.join(self.snapshot_dir, meta['file'])
+        table = pa.Table.from_pandas(records, preserve_index=False)
+        with pa.OSFile(path + ".tmp", 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path + ".tmp", path)
+        # The metadata file is the commit point; older record files are dropped after it
+        with open(self._meta_path() + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=1)
+        os.replace(self._meta_path() + ".tmp", self._meta_path())
+        for name in os.listdir(self.snapshot_dir):
+            if name.startswith("master-v") and name != meta['file']:
+                try: os.remove(os.path.join(self.snapshot_dir, name))
+                except OSError: pass
+
+    def _publish(self, lookup):
+        """Swap in a new lookup; every published lookup gets a new generation."""
+        self._generation += 1
+        lookup.generation = self._generation
+        self._lookup = lookup
+
+    def _swap(self, records, meta):
+        self._meta = meta
+        self._publish(MasterLookup(records, "Success"))
+
+    # --- refresh ---
+    def refresh(self):
+        """One conditional fetch: 'updated', 'not-modified' or 'failed'."""
+        with self._refresh_lock:
+            outcome = self._refresh()
+            self.last_refresh = (time.time(), outcome)
+            if outcome == 'failed' and self._lookup.status == "Pending":
+                self._load_local_fallback()
+            return outcome
+
+    def _refresh(self):
+        headers = {}
+        if self._meta.get('etag'): headers['If-None-Match'] = self._meta['etag']
+        if self._meta.get('last_modified'): headers['If-Modified-Since'] = self._meta['last_modified']
+        try:
+            r = requests.get(self.url, headers=headers, timeout=self.timeout)
+        except Exception as e:
+            self.last_error = repr(e)
+            return 'failed'
+        if r.status_code == 304: return 'not-modified'
+        if not r.ok:
+            self.last_error = f"HTTP {r.status_code}"
+            return 'failed'
+
+        sha1 = hashlib.sha1(r.content).hexdigest()
+        if sha1 == self._meta.get('sha1'):
+            return 'not-modified'  # server ignores validators but the sheet did not change
+        try:
+            df = pd.read_csv(io.BytesIO(r.content), encoding='utf-8')
+            if df.empty: raise ValueError("empty sheet")
+            records = build_records(df)
+        except Exception as e:
+            self.last_error = repr(e)
+            return 'failed'
+
+        version = self.version + 1
+        meta = {'format': SNAPSHOT_FORMAT, 'version': version, 'file': f"master-v{version}.arrow",
+                'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'),
+                'sha1': sha1, 'rows': len(records), 'fetched_at': time.time(), 'source': self.url}
+        try: self._write_snapshot(records, meta)
+        except OSError as e: self.last_error = repr(e)  # still serve the new data from memory
+        self._swap(records, meta)
+        self.last_error = None
+        return 'updated'
+
+    def _load_local_fallback(self):
+        df = read_local_master()
+        if df is None or df.empty:
+            self._publish(MasterLookup.empty("Failed"))
+            return
+        self._publish(MasterLookup(build_records(df), "Success"))
+
+    # --- lifecycle ---
+    def start(self, background=True, refresh=True):
+        """Serve the snapshot now; refresh from the sheet on a daemon thread.
+
+        background=False (batch mode): refresh once, synchronously, and start no
+        thread - or not at all with refresh=False (offline).
+        """
+        if not self.load_snapshot() and (glob.glob("*master*.csv") or glob.glob("*MASTER*.csv")):
+            self._load_local_fallback()
+        if not background:
+            if refresh: self.refresh()
+            elif self._lookup.status == "Pending": self._load_local_fallback()
+            return self
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="master-db-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: self.refresh()
+            except Exception as e: self.last_error = repr(e)
+            self._stop.wait(self.refresh_interval)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,79 @@
+"""Relevance ranking for search results.
+
+Every result row carries a Relevance score, computed when the hit is
+coach-matched (search_engine.enrich_hits) from:
+
+  - the snippet's context score (SnippetEngine.scored: hometown / high-school
+    words up, roster lists and short windows down)
+  - how often the keyword occurs in the bio
+  - where it occurs: in the parsed Name / Title / School header, or how close
+    to the top of the bio
+  - how the coach contact was matched (exact > global > fuzzy > none)
+
+The default tables keep their Role / School / Name order; `top_k` picks the
+best rows per keyword with a heap instead of sorting the whole table, and
+`cross_keyword_view` lists the people found under several keywords.
+"""
+import heapq
+import math
+import re
+
+import pandas as pd
+
+from bio_parser import Phrase, keyword_regex
+
+CONTEXT_WEIGHT = 1.0  # x snippet context score (+10 per hometown word, -15 list, -50 roster dump)
+FREQUENCY_WEIGHT = 5.0  # x log2(1 + occurrences)
+POSITION_WEIGHT = 10.0  # x (1 - first occurrence / bio length)
+FIELD_BONUS = {'Name': 30, 'Title': 15, 'School': 15}  # keyword in the parsed header field
+SOURCE_BONUS = {'exact': 20, 'global': 10, 'fuzzy': 5, '': 0}  # coach contact match confidence
+
+TOP_K = 100
+CROSS_COLUMNS = ['Name', 'School', 'Role', 'Title', 'Email', 'Twitter', 'Keywords', 'Keyword_Count', 'Relevance']
+
+
+def relevance(keyword, snippet, meta, match_source=''):
+    """One hit's score (see module docstring). `snippet` is a bio_parser.Snippet."""
+    kw = keyword.lower()
+    # A Phrase is in a field the way it is in the bio: punctuation between its words
+    phrase = re.compile(keyword_regex(keyword), re.IGNORECASE) if isinstance(keyword, Phrase) else None
+    score = CONTEXT_WEIGHT * snippet.score
+    score += FREQUENCY_WEIGHT * math.log2(1 + snippet.matches)
+    score += POSITION_WEIGHT * (1 - snippet.position)
+    in_field = (lambda text: phrase.search(text) is not None) if phrase else (lambda text: kw in text.lower())
+    score += sum(bonus for field, bonus in FIELD_BONUS.items() if in_field(str(meta.get(field) or "")))
+    score += SOURCE_BONUS.get(match_source, 0)
+    return round(score, 1)
+
+
+def top_k(df, k=TOP_K):
+    """The k highest-Relevance rows, best first; ties keep file order (the frame index).
+
+    A heap selection: O(n log k) instead of sorting all n rows.
+    """
+    if len(df) <= 1: return df
+    scores, order = df['Relevance'].to_numpy(), df.index.to_numpy()
+    best = heapq.nlargest(k, range(len(df)), key=lambda i: (scores[i], -order[i]))
+    return df.iloc[best]
+
+
+def cross_keyword_view(results, min_keywords=2, k=TOP_K):
+    """People (Name + School) found under at least `min_keywords` keywords, most keywords
+    then highest total Relevance first. Keeps the (Chunk, Row) of their first hit."""
+    if len(results) < min_keywords: return pd.DataFrame(columns=CROSS_COLUMNS)
+    found = {}  # (name, school) -> [first row, keywords, total relevance]
+    for kw, df in results.items():
+        for row in df.itertuples(index=False):
+            entry = found.setdefault((row.Name, row.School), [row, [], 0.0])
+            if kw not in entry[1]:
+                entry[1].append(kw)
+                entry[2] += row.Relevance
+    people = [entry for entry in found.values() if len(entry[1]) >= min_keywords]
+    best = heapq.nlargest(k, range(len(people)), key=lambda i: (len(people[i][1]), people[i][2], -i))
+    rows = []
+    for i in best:
+        row, kws, total = people[i]
+        rows.append({'Name': row.Name, 'School': row.School, 'Role': row.Role, 'Title': row.Title,
+                     'Email': row.Email, 'Twitter': row.Twitter, 'Keywords': ", ".join(kws),
+                     'Keyword_Count': len(kws), 'Relevance': round(total, 1), 'Chunk': row.Chunk, 'Row': row.Row})
+    return pd.DataFrame(rows, columns=CROSS_COLUMNS + ['Chunk', 'Row'])
@@ -0,0 +1,140 @@
+"""On-demand, streaming exports of search results (Excel, CSV, ZIP of CSVs).
+
+Nothing is built until a download is actually requested. Result frames only
+carry (Chunk, Row) bio references, so rows are hydrated in batches and written
+straight to a temporary file: the Excel writer runs in xlsxwriter's
+constant_memory mode (rows are flushed as they are written), the CSV writers
+stream through the file handle. Memory stays flat however broad the search;
+only the finished file is read back, as the bytes the download button serves.
+"""
+import csv
+import io
+import os
+import re
+import tempfile
+import time
+import zipfile
+
+import pandas as pd
+import xlsxwriter
+
+from diagnostics import get_logger, log_event
+
+EXPORT_BATCH_ROWS = 2000
+
+# format -> (label, extension, MIME type)
+EXPORT_FORMATS = {
+    'xlsx': ("Excel", "xlsx", "application/vnd.ms-excel"),
+    'csv': ("CSV", "csv", "text/csv"),
+    'zip': ("ZIP (one CSV per keyword)", "zip", "application/zip"),
+}
+
+EXCEL_COLUMN_WIDTHS = [(0, 0, 15), (1, 5, 25), (6, 6, 50), (7, 7, 50)]
+# The header pandas' to_excel writes (what the pre-streaming exports looked like)
+EXCEL_HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+def sheet_name(keyword):
+    return re.sub(r'[^a-zA-Z0-9 ]', '', keyword)[:30]
+
+
+def _unique_names(keywords):
+    """One sheet / file name per keyword (sanitized names can collide or come out empty)."""
+    names, used = {}, set()
+    for kw in keywords:
+        base = sheet_name(kw) or "Sheet"
+        name, n = base, 2
+        while name.lower() in used:
+            name = f"{base[:30 - len(str(n)) - 1]} {n}"
+            n += 1
+        used.add(name.lower())
+        names[kw] = name
+    return names
+
+
+def iter_batches(df, hydrate, batch_rows=EXPORT_BATCH_ROWS):
+    """Hydrated slices of a result frame, `batch_rows` at a time."""
+    for start in range(0, len(df), batch_rows):
+        yield hydrate(df.iloc[start:start + batch_rows])
+
+
+def write_excel(results, hydrate, fileobj):
+    workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True})
+    names = _unique_names(results)
+    header_format = workbook.add_format(EXCEL_HEADER_FORMAT)
+    for kw, df in results.items():
+        worksheet = workbook.add_worksheet(names[kw])
+        for first, last, width in EXCEL_COLUMN_WIDTHS:
+            worksheet.set_column(first, last, width)
+        row = 0
+        for batch in iter_batches(df, hydrate):
+            if row == 0:
+                worksheet.write_row(0, 0, list(batch.columns), header_format)
+                row = 1
+            for values in batch.itertuples(index=False, name=None):
+                for col, value in enumerate(values):
+                    if value is not None and not (isinstance(value, float) and pd.isna(value)):
+                        worksheet.write(row, col, value)
+                row += 1
+    workbook.close()
+
+
+def _write_csv(writer, batches, header=True, keyword=None):
+    """Stream hydrated batches as CSV rows; `keyword` adds a leading Keyword column.
+    Returns whether the header is still to be written."""
+    for batch in batches:
+        if keyword is not None: batch = batch.assign(Keyword=keyword)[['Keyword', *batch.columns]]
+        if header:
+            writer.writerow(batch.columns)
+            header = False
+        writer.writerows(batch.fillna("").itertuples(index=False, name=None))
+    return header
+
+
+def write_csv(results, hydrate, fileobj):
+    """Every keyword in ONE CSV, tagged with a Keyword column."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    writer, header = csv.writer(text), True
+    for kw, df in results.items():
+        header = _write_csv(writer, iter_batches(df, hydrate), header, keyword=kw)
+    text.flush()
+    text.detach()
+
+
+def write_zip(results, hydrate, fileobj):
+    """One CSV per keyword, deflated - the format for very large result sets."""
+    names = _unique_names(results)
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for kw, df in results.items():
+            with archive.open(f"{names[kw]}.csv", 'w') as member:
+                text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                _write_csv(csv.writer(text), iter_batches(df, hydrate))
+                text.flush()
+                text.detach()
+
+
+WRITERS = {'xlsx': write_excel, 'csv': write_csv, 'zip': write_zip}
+
+
+def export_to_path(results, fmt, hydrate, path):
+    """Write an export straight to `path` (atomically, via a temp file next to it)."""
+    tmp = path + ".tmp"
+    with open(tmp, 'w+b') as fileobj:
+        _write(results, fmt, hydrate, fileobj)
+    os.replace(tmp, path)
+
+
+def _write(results, fmt, hydrate, fileobj):
+    start = time.perf_counter()
+    WRITERS[fmt](results, hydrate, fileobj)
+    log_event(get_logger("export"), "export", format=fmt, keywords=len(results),
+              rows=sum(len(df) for df in results.values()), bytes=fileobj.tell(),
+              seconds=round(time.perf_counter() - start, 4))
+
+
+def export_file(results, fmt, hydrate):
+    """Build the export in an anonymous temp file and return its bytes (what st.download_button takes)."""
+    with tempfile.TemporaryFile() as fileobj:
+        _write(results, fmt, hydrate, fileobj)
+        fileobj.seek(0)
+        return fileobj.read()
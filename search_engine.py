@@ -0,0 +1,655 @@
+"""Chunk-level search work, runnable in worker processes.
+
+`search_chunk` does everything for ONE chunk that depends only on the corpus
+and the keywords: index lookup, regex scan, metadata join, junk/sport filter,
+keyword routing and snippets. Coach matching against the master DB stays in
+the caller (cheap dict probes, and the lookups are too big to ship to every
+worker).
+
+`enrich_hits` attaches master-DB contact data to one chunk's hits in a single
+batch join. `SearchEngine` bundles the master DB and the corpus readers into
+the one read-only object a process shares across sessions.
+
+`ResultCache` keeps finished per-keyword frames across searches and sessions,
+keyed on the keyword and the corpus + master-DB version they were built from.
+
+`SearchEngine.search` is the whole Search button without Streamlit. Batch
+mode runs a keyword file through it and writes the results to disk:
+
+    python search_engine.py keywords.txt --out sweep.xlsx [--corpus DIR] [--offline]
+
+`SearchJob` runs a search on a background thread for the app to poll: partial
+results as chunks complete, cancel, and an optional per-keyword hit cap.
+
+`SearchEngine` takes an optional corpus_manager.CorpusManager: new searches
+then read its current snapshot (immutable, rebuilt in the background as chunks
+change) instead of the chunk files in the current directory.
+
+`iter_chunk_results` fans chunks out to a process-wide pool and yields each
+chunk's hits (with its stage timings, or the reason it was skipped) as soon
+as it finishes, so callers can render partial results.
+"""
+import os
+import re
+import glob
+import sys
+import types
+import hashlib
+import json
+import threading
+import time
+import contextlib
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from bio_parser import Phrase, SnippetEngine, bio_metadata, detect_sport_batch, keyword_regex
+from corpus_manager import CorpusSnapshot
+from corpus_store import STORE_DIR, CorpusStore
+from diagnostics import SearchDiagnostics, StageStats
+from fuzzy import fold_results, fuzzy_plan
+from ranking import relevance, top_k
+from result_export import EXPORT_FORMATS, export_to_path
+from search_index import INDEX_DIR, SearchIndex, union_candidates
+
+# 0 = one per core; 1 = serial (no pool)
+SEARCH_WORKERS = int(os.environ.get("RECRUITING_SEARCH_WORKERS", "0")) or (os.cpu_count() or 1)
+# "process" (default) or "thread" (the Arrow regex scan releases the GIL, the Python parsing does not)
+SEARCH_EXECUTOR = os.environ.get("RECRUITING_SEARCH_EXECUTOR", "process")
+
+# Chunks queued per worker: enough to keep workers busy, few enough that a
+# cancel or a filled hit cap stops the pass quickly
+CHUNKS_IN_FLIGHT = 2
+
+# Default per-keyword result cap (0 = no cap): broad keywords stop scanning once they have this many
+MAX_HITS = int(os.environ.get("RECRUITING_MAX_HITS", "0"))
+# A background job rebuilds its preview frames at most this often (seconds)
+PARTIAL_INTERVAL = 0.5
+
+# Batch sweeps: past this many keywords the candidate union is ~every row - scan
+# linearly instead (the per-keyword candidates still route the matches)
+INDEX_MAX_KEYWORDS = 32
+
+# Memory budget for cached result frames, shared by every session
+RESULT_CACHE_MB = int(os.environ.get("RECRUITING_RESULT_CACHE_MB", "256"))
+
+# Result columns that point at the bio instead of carrying it
+BIO_REF_COLUMNS = ['Chunk', 'Row']
+# Result columns for ranking only - never shown by default, never exported
+RANK_COLUMNS = ['Relevance']
+# One result row before it becomes a frame (a tuple: no per-row dict)
+ResultRow = namedtuple('ResultRow', ['Role', 'Name', 'Title', 'School', 'Email', 'Twitter', 'Context',
+                                     *BIO_REF_COLUMNS, *RANK_COLUMNS])
+# Compact dtypes for the frames sessions hold: categoricals for repeated values
+# (contact columns are mostly blank), Arrow strings for the rest (one buffer, no object per value)
+CATEGORY_COLUMNS = ['Role', 'Title', 'School', 'Email', 'Twitter', 'Chunk']
+STRING_COLUMNS = ['Name', 'Context']
+
+_readers_by_dir = {}
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _reset_pool(broken=None):
+    """Drop the pool (only if it is still `broken`: another search may have replaced it already)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or (broken is not None and _pool is not broken): return
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _readers(directory="."):
+    """Per-process CorpusStore / SearchIndex for the chunks in `directory` (memory maps are opened once per worker).
+
+    A directory's store and index live inside it (.corpus_store, .search_index).
+    """
+    directory = os.path.normpath(directory or ".")
+    if directory not in _readers_by_dir:
+        _readers_by_dir[directory] = (CorpusStore(os.path.join(directory, STORE_DIR)),
+                                      SearchIndex(os.path.join(directory, INDEX_DIR)))
+    return _readers_by_dir[directory]
+
+
+def reset_readers():
+    """Forget this process's readers (after switching to another corpus directory)."""
+    _readers_by_dir.clear()
+
+
+def build_combined_pattern(keywords):
+    """V1.27: ONE alternation regex so a chunk is scanned once for ALL keywords."""
+    return "|".join(keyword_regex(kw) for kw in keywords)
+
+
+def search_chunk(file, keywords, stats=None):
+    """Hits for one chunk: [(row id, meta, [(kw, Snippet), ...]), ...] in row order.
+
+    Bio text never leaves the worker - results reference it by (chunk, row id).
+    Stage timings and row counts are added to `stats` (a StageStats) if given.
+    """
+    if stats is None: stats = StageStats()
+    store, index = _readers(os.path.dirname(file))
+    hits = []
+
+    # V1.27: INDEX LOOKUP (None = chunk not indexed / stale -> linear scan)
+    with stats.time('index'):
+        kw_rows = index.keyword_candidates(file, keywords)
+        candidates = union_candidates(kw_rows) if len(keywords) <= INDEX_MAX_KEYWORDS else None
+    if candidates is None: stats.add('chunks_unindexed', 1)
+    elif not candidates: return hits
+
+    # V1.27: COLUMNAR STORE - regex runs over memory-mapped Arrow buffers (CSV if stale)
+    with stats.time('read'):
+        bios = store.load(file)
+    if isinstance(bios, pd.Series): stats.add('chunks_csv', 1)  # not in the store (or stale)
+    stats.add('rows_scanned', len(candidates) if candidates is not None else len(bios))
+    with stats.time('match'):
+        matches = store.match(bios, build_combined_pattern(keywords), sorted(candidates) if candidates is not None else None)
+        # Route each matched bio to every keyword tab it belongs to. A keyword the index answered is
+        # confirmed only on its own candidates (they hold its tokens: the search stops at the first
+        # occurrence); only the others scan every match
+        routes, bio_of = {}, dict(matches.items())
+        for kw in keywords:
+            rows = kw_rows.get(kw) if kw_rows is not None else None
+            if rows is None:
+                hit_rows = matches.index[matches.str.contains(keyword_regex(kw), flags=re.IGNORECASE, na=False, regex=True)]
+            else:
+                kw_re = re.compile(keyword_regex(kw), re.IGNORECASE)
+                hit_rows = [idx for idx in sorted(rows & bio_of.keys()) if kw_re.search(bio_of[idx])]
+            for idx in hit_rows: routes.setdefault(idx, []).append(kw)
+    stats.add('rows_matched', len(matches))
+    if not len(matches): return hits
+
+    # V1.27: METADATA JOIN - precomputed at ingest (parse on the fly if stale)
+    with stats.time('metadata'):
+        metas = store.metadata(file, list(matches.index))
+    if metas is None:
+        # Stale chunk: classify the whole match set in one vectorized pass instead
+        with stats.time('detect_sport'):
+            is_football = detect_sport_batch(matches)['is_football']
+        with stats.time('parse_header'):
+            metas = [bio_metadata(bio, bool(is_football[idx])) for idx, bio in matches.items()]
+    kept = []
+    for pos, (idx, bio) in enumerate(matches.items()):
+        hit_kws = routes.get(idx)
+        if not hit_kws: continue
+
+        meta = metas[pos]
+        # --- V1.22 / V1.19: SKIP BAD ROWS + STRICT SPORT SANITATION ---
+        if meta['junk'] or not meta['is_football']: continue
+        kept.append((idx, bio, meta, hit_kws))
+    stats.add('rows_kept', len(kept))
+
+    # V1.27: SNIPPETS per keyword over its whole match set, patterns compiled once
+    snippets = {}
+    with stats.time('snippet'):
+        for kw in keywords:
+            rows = [(idx, bio) for idx, bio, _, hit_kws in kept if kw in hit_kws]
+            if not rows: continue
+            for (idx, _), snippet in zip(rows, SnippetEngine(kw).scored_snippets([bio for _, bio in rows])):
+                snippets[idx, kw] = snippet
+    for idx, _, meta, hit_kws in kept:
+        hits.append((idx, meta, [(kw, snippets[idx, kw]) for kw in hit_kws]))
+    return hits
+
+
+def enrich_hits(file, hits, master, keywords):
+    """Coach-match one chunk's hits in ONE batch join -> {kw: [ResultRow, ...]}."""
+    rows_by_kw = {kw: [] for kw in keywords}
+    if not hits: return rows_by_kw
+    contacts = master.match(pd.DataFrame([meta for _, meta, _ in hits]))
+    for (row, meta, snippets), (*contact, source) in zip(hits, contacts.itertuples(index=False, name=None)):
+        for kw, snippet in snippets:
+            rows_by_kw[kw].append(ResultRow(*contact, snippet.text, file, row, relevance(kw, snippet, meta, source)))
+    return rows_by_kw
+
+
+def merge_chunk_rows(chunk_rows, keywords):
+    """V1.27: Chunks finish in any order - merge in FILE order so dedupe keeps the same row."""
+    return {kw: [r for i in sorted(chunk_rows) for r in chunk_rows[i].get(kw, ())] for kw in keywords}
+
+
+def build_result_frames(results_by_kw):
+    """One deduped, sorted DataFrame per keyword (keywords with no hits are left out)."""
+    frames = {}
+    for kw, results_found in results_by_kw.items():
+        if results_found:
+            df_res = pd.DataFrame(results_found).drop_duplicates(subset=['Name', 'School'])
+            df_res['Context'] = df_res['Context'].astype(str).str.replace(r'[\r\n]+', ' ', regex=True)
+            df_res.sort_values(by=['Role', 'School', 'Name'], ascending=[True, True, True], inplace=True)
+            frames[kw] = df_res.astype({**{col: 'category' for col in CATEGORY_COLUMNS},
+                                        **{col: 'str' for col in STRING_COLUMNS}})
+    return frames
+
+
+def cap_frame(df, max_hits):
+    """The first `max_hits` rows in FILE order (the frame index), still sorted for display."""
+    if not max_hits or len(df) <= max_hits: return df
+    return df.sort_index().head(max_hits).sort_values(by=['Role', 'School', 'Name'])
+
+
+def hydrate_bios(df, store=None):
+    """Swap the (Chunk, Row) bio references for the Full_Bio text (export / detail views)."""
+    full_bio = pd.Series("", index=df.index, dtype=object)
+    for chunk, group in df.groupby('Chunk', sort=False, observed=True):
+        full_bio[group.index] = (store or _readers(os.path.dirname(chunk))[0]).bios(chunk, group['Row'].tolist())
+    out = df.drop(columns=[c for c in BIO_REF_COLUMNS + RANK_COLUMNS if c in df])
+    out = out.astype({col: object for col in out.columns if isinstance(out[col].dtype, pd.CategoricalDtype)})
+    out['Full_Bio'] = full_bio.astype(str).str.replace(r'[\r\n]+', ' ', regex=True)
+    return out
+
+
+def list_chunks(pattern="chunk_*.csv"):
+    """The corpus: chunk files in the current directory, in search (= dedupe) order."""
+    return sorted(glob.glob(pattern))
+
+
+def normalize_keyword(keyword):
+    """Cache key for a keyword. Matching is case-insensitive, so ASCII case is folded;
+    anything else is kept verbatim (Unicode lowering can change what a regex matches).
+    A Phrase gets its own key: it finds more than the same text typed literally."""
+    if isinstance(keyword, Phrase): return ('phrase', str(keyword))
+    keyword = str(keyword).strip()
+    return keyword.lower() if keyword.isascii() else keyword
+
+
+def corpus_version(chunk_files):
+    """Fingerprint of the chunk set: names + mtime/size, like the store/index manifests."""
+    h = hashlib.sha1()
+    for file in chunk_files:
+        try: mtime_ns, size = os.stat(file).st_mtime_ns, os.stat(file).st_size
+        except OSError: mtime_ns, size = None, None
+        h.update(f"{os.path.basename(file)}:{mtime_ns}:{size};".encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU of finished per-keyword frames, bounded by their memory footprint.
+
+    Cached frames are shared between sessions - treat them as read-only.
+    None is cached too: "this keyword has no hits" is worth remembering.
+    """
+
+    def __init__(self, max_mb=RESULT_CACHE_MB):
+        self.max_bytes = max_mb << 20
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (frame or None, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """(found, frame)."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key][0]
+
+    def put(self, key, frame):
+        size = int(frame.memory_usage(deep=True).sum()) if frame is not None else 0
+        if size > self.max_bytes: return
+        with self._lock:
+            if key in self._entries: self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (frame, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+class SearchEngine:
+    """Process-wide, read-only search state shared by every session.
+
+    Holds the master DB source and, optionally, the corpus manager. Result frames
+    carry (Chunk, Row) references instead of bio text, so a session's results
+    stay small; `hydrate_bios` fills Full_Bio in only when it is actually needed.
+    """
+
+    def __init__(self, master_source, corpus=None):
+        self.master_source = master_source
+        self.corpus = corpus  # CorpusManager, or None: the chunk files in the current directory
+        self.cache = ResultCache()
+
+    @property
+    def master(self):
+        return self.master_source.current()
+
+    def snapshot(self):
+        """The corpus a new search reads. Hold on to it while its results may still need their bios."""
+        if self.corpus is not None: return self.corpus.current()
+        return CorpusSnapshot(0, list_chunks())
+
+    def result_version(self, chunk_files, master=None):
+        """What a cached frame depends on besides its keyword."""
+        return corpus_version(chunk_files), (master or self.master).generation
+
+    def cached_results(self, keywords, version):
+        """({kw: frame or None} served from cache, [keywords still to search])."""
+        cached, todo = {}, []
+        for kw in keywords:
+            found, frame = self.cache.get((normalize_keyword(kw), version))
+            if found: cached[kw] = frame
+            elif kw not in todo: todo.append(kw)
+        return cached, todo
+
+    def cache_results(self, frames, keywords, version):
+        """Remember fresh frames for `keywords` (missing ones had no hits)."""
+        for kw in keywords:
+            self.cache.put((normalize_keyword(kw), version), frames.get(kw))
+
+    def search_chunks(self, chunk_files, keywords, active=None):
+        return iter_chunk_results(chunk_files, keywords, active=active)
+
+    def search(self, keywords, chunk_files=None, progress=None, cancel=None, max_hits=0, fuzzy=False):
+        """The Search button, headless -> ({kw: frame}, SearchDiagnostics).
+
+        ONE pass over the corpus for every keyword not already cached; keywords
+        with no hits are left out. `progress(done, total, partial)` is called as
+        each chunk completes - `partial()` builds the results found so far.
+        Setting the `cancel` event stops the pass (results so far are returned).
+        `max_hits` keeps the first N rows per keyword in file order and stops
+        scanning for a keyword once it has them. `fuzzy` also searches typo /
+        synonym variants of each keyword (see fuzzy.py). Without `chunk_files` the
+        engine's current snapshot is searched.
+        """
+        snapshot = self.snapshot() if chunk_files is None else None  # held to the end: keeps its files
+        chunk_files = snapshot.chunk_files if snapshot is not None else chunk_files
+        if fuzzy:
+            index = _readers(os.path.dirname(chunk_files[0]) if chunk_files else ".")[1]
+            plan = fuzzy_plan(keywords, index.vocabulary())
+            variants = list(dict.fromkeys(v for kw_variants in plan.values() for v, _ in kw_variants))
+            fuzzy_progress = progress and (lambda done, total, partial: progress(
+                done, total, lambda: fold_results(partial(), plan, max_hits)))
+            results, diag = self.search(variants, chunk_files, fuzzy_progress, cancel, max_hits)
+            diag.fuzzy = {kw: [v for v, _ in kw_variants[1:]] for kw, kw_variants in plan.items()}
+            return fold_results(results, plan, max_hits), diag
+
+        master = self.master  # one master DB version for the whole search
+        version = self.result_version(chunk_files, master)
+        cached, todo = self.cached_results(keywords, version)
+        diag = SearchDiagnostics(keywords, len(chunk_files))
+        diag.searched, diag.max_hits = todo, max_hits
+        chunk_rows = {}  # chunk position -> {kw: rows}
+        # Hit cap: a keyword is full once the chunks done IN FILE ORDER hold max_hits distinct rows
+        completed, prefix = set(), 0
+        seen = {kw: set() for kw in todo}
+        capped = set()
+
+        def active():
+            return [kw for kw in todo if kw not in capped]
+
+        def partial():
+            frames = build_result_frames(merge_chunk_rows(chunk_rows, todo))
+            frames.update((kw, df) for kw, df in cached.items() if df is not None)
+            return {kw: cap_frame(df, max_hits) for kw, df in frames.items()}
+
+        chunks = self.search_chunks(chunk_files, todo, active if max_hits else None) if todo else []
+        for done, (i, hits, stats, error, kws) in enumerate(chunks, start=1):
+            diag.chunk_done(chunk_files[i], stats, error)
+            if hits is not None:
+                # Coach-match the whole chunk in one join, shared by all keywords
+                with diag.stats.time('contact_match'):
+                    chunk_rows[i] = self.enrich(chunk_files[i], hits, kws, master)
+            completed.add(i)
+            while max_hits and prefix in completed:
+                for kw, rows in chunk_rows.get(prefix, {}).items():
+                    seen[kw].update((r.Name, r.School) for r in rows)
+                    if len(seen[kw]) >= max_hits: capped.add(kw)
+                prefix += 1
+            if progress: progress(done, len(chunk_files), partial)
+            if cancel is not None and cancel.is_set():
+                diag.cancelled = True
+                break
+
+        with diag.stats.time('dedupe_sort'):
+            fresh = build_result_frames(merge_chunk_rows(chunk_rows, todo))
+        if not diag.skipped and not diag.cancelled:  # never cache an incomplete search
+            self.cache_results(fresh, [kw for kw in todo if kw not in capped], version)
+        diag.capped = sorted(capped)
+        merged = {**cached, **fresh}
+        results = {kw: cap_frame(merged[kw], max_hits) for kw in keywords if merged.get(kw) is not None}
+        return results, diag.finish(results)
+
+    def export(self, results, fmt, path):
+        """Write results to `path` (xlsx / csv / zip), streaming."""
+        export_to_path(results, fmt, self.hydrate_bios, path)
+
+    def enrich(self, file, hits, keywords, master=None):
+        return enrich_hits(file, hits, master or self.master, keywords)
+
+    def hydrate_bios(self, df):
+        return hydrate_bios(df)
+
+
+class SearchJob:
+    """One SearchEngine.search running on a background thread.
+
+    The UI polls it: `done`/`total` for progress, `partial` for the results found
+    so far (refreshed as chunks complete), `results`/`diagnostics` once it has
+    finished. `cancel()` stops it after the chunks already in flight. Without
+    `chunk_files` it searches the engine's current `snapshot`, and keeps it.
+    """
+
+    def __init__(self, engine, keywords, chunk_files=None, max_hits=MAX_HITS, fuzzy=False):
+        self.engine = engine
+        self.keywords = list(keywords)
+        self.snapshot = engine.snapshot() if chunk_files is None else None
+        self.chunk_files = self.snapshot.chunk_files if chunk_files is None else chunk_files
+        self.max_hits, self.fuzzy = max_hits, fuzzy
+        self.done, self.total = 0, len(self.chunk_files)
+        self.partial = {}
+        self.results = self.diagnostics = self.error = None
+        self.started = None
+        self._cancel = threading.Event()
+        self._last_partial = 0.0
+        self._thread = threading.Thread(target=self._run, name="search-job", daemon=True)
+
+    def start(self):
+        self.started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.started is not None and not self._thread.is_alive()
+
+    def _progress(self, done, total, partial):
+        self.done, self.total = done, total
+        # First chunk renders at once (time to first result); after that, throttled
+        now = time.monotonic()
+        if now - self._last_partial >= PARTIAL_INTERVAL:
+            self.partial = partial()
+            self._last_partial = now
+
+    def _run(self):
+        try:
+            self.results, self.diagnostics = self.engine.search(
+                self.keywords, self.chunk_files, progress=self._progress,
+                cancel=self._cancel, max_hits=self.max_hits, fuzzy=self.fuzzy)
+            self.partial = self.results
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+
+def _safe_search_chunk(file, keywords):
+    """(hits, stats, None) or (None, stats, reason) - a bad chunk never sinks the search."""
+    stats = StageStats()
+    try:
+        return search_chunk(file, keywords, stats), stats, None
+    except Exception as e:
+        return None, stats, f"{type(e).__name__}: {e}"
+
+
+@contextlib.contextmanager
+def _hidden_main():
+    """Spawned workers re-run the __main__ script - under Streamlit that IS app.py. Hide it."""
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try: yield
+    finally: sys.modules['__main__'] = main
+
+
+@contextlib.contextmanager
+def _module_path():
+    """Spawned workers import this module by name, from the sys.path they start with. Streamlit
+    only puts the app directory there while the script runs - not on a SearchJob's thread."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    added = here not in sys.path
+    if added: sys.path.insert(0, here)
+    try: yield
+    finally:
+        if added and here in sys.path: sys.path.remove(here)
+
+
+def get_pool():
+    """Process-wide worker pool (spawned, so workers never inherit Streamlit state)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if SEARCH_EXECUTOR == "thread":
+                _pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS)
+            else:
+                pool = ProcessPoolExecutor(max_workers=SEARCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+                # Start EVERY worker now (one per warm-up task) so none is spawned later with app.py as __main__
+                with _hidden_main(), _module_path():
+                    warmup = [pool.submit(os.getpid) for _ in range(SEARCH_WORKERS)]
+                for future in warmup: future.result()
+                _pool = pool
+        return _pool
+
+
+def iter_chunk_results(chunk_files, keywords, workers=SEARCH_WORKERS, active=None):
+    """Yield (chunk position, hits, StageStats, skip reason, keywords searched) as chunks complete.
+
+    hits is None (and the reason says why) for a chunk that failed. Completion
+    order is arbitrary - merge by chunk position to reproduce the serial order
+    (which decides who wins drop_duplicates). Chunks are handed out a few at a
+    time, in file order; `active()`, if given, picks the keywords for each new
+    chunk (an empty list stops the pass).
+    """
+    def next_keywords():
+        return active() if active is not None else keywords
+
+    if workers <= 1 or len(chunk_files) <= 1:
+        for i, file in enumerate(chunk_files):
+            kws = next_keywords()
+            if not kws: return
+            yield (i, *_safe_search_chunk(file, kws), kws)
+        return
+
+    pool = get_pool()
+    pending = {}  # future -> (chunk position, keywords)
+    queue = iter(enumerate(chunk_files))
+    unsubmitted = []  # (chunk position, keywords) left over when the pool broke
+
+    def submit():
+        while len(pending) < workers * CHUNKS_IN_FLIGHT:
+            kws = next_keywords()
+            item = next(queue, None) if kws else None
+            if item is None: return
+            try: pending[pool.submit(_safe_search_chunk, item[1], kws)] = (item[0], kws)
+            except BrokenProcessPool:
+                _reset_pool(pool)  # a worker died; the next search gets a fresh pool
+                unsubmitted.extend((i, kws) for i, _ in [item, *queue])
+                return
+
+    try:
+        submit()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i, kws = pending.pop(future)
+                try: result = future.result()
+                except BrokenProcessPool:
+                    _reset_pool(pool)
+                    result = (None, None, "BrokenProcessPool: worker process died")
+                except Exception as e: result = (None, None, f"{type(e).__name__}: {e}")
+                yield (i, *result, kws)
+            submit()
+        for i, kws in unsubmitted:
+            yield (i, None, None, "BrokenProcessPool: worker process died", kws)
+    finally:
+        for future in pending: future.cancel()
+
+
+# --- BATCH MODE ---
+def read_keyword_file(path):
+    """Keywords from a text file: one per line (or comma-separated like the search box), '#' comments."""
+    keywords = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            for kw in line.split(','):
+                if kw.strip() and kw.strip() not in keywords: keywords.append(kw.strip())
+    return keywords
+
+
+def main(argv=None):
+    import argparse
+    from datetime import datetime
+    from master_db import MasterSource
+
+    parser = argparse.ArgumentParser(description="Search the bio corpus for a keyword file in ONE batched pass")
+    parser.add_argument('keyword_file', help="one keyword per line (commas also split), '#' starts a comment")
+    parser.add_argument('--out', help="output file; format from the extension (default: sweep_<date>.zip)")
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), help="override the output format")
+    parser.add_argument('--corpus', default=".", help="directory holding chunk_*.csv (default: current)")
+    parser.add_argument('--offline', action='store_true', help="use the master DB snapshot/local CSV, skip the sheet")
+    parser.add_argument('--diagnostics', help="also write the search diagnostics here as JSON")
+    parser.add_argument('--top', type=int, default=0, help="export only the N most relevant matches per keyword, best first")
+    parser.add_argument('--fuzzy', action='store_true', help="also match typos, abbreviations and synonyms")
+    parser.add_argument('--max-hits', type=int, default=MAX_HITS, help="keep the first N matches per keyword (0 = all)")
+    args = parser.parse_args(argv)
+
+    keywords = read_keyword_file(args.keyword_file)
+    out = os.path.abspath(args.out or f"sweep_{datetime.now().date()}.zip")
+    fmt = args.format or os.path.splitext(out)[1].lstrip('.').lower()
+    if fmt not in EXPORT_FORMATS: parser.error(f"unknown output format {fmt!r}; use --format")
+    diagnostics_path = os.path.abspath(args.diagnostics) if args.diagnostics else None
+    os.chdir(args.corpus)  # store, index and snapshot dirs are relative to the corpus
+
+    chunk_files = list_chunks()
+    if not keywords: parser.error("no keywords in the keyword file")
+    if not chunk_files: parser.error(f"no chunk_*.csv files in {args.corpus}")
+    engine = SearchEngine(MasterSource().start(background=False, refresh=not args.offline))
+    print(f"Searching {len(chunk_files)} files for {len(keywords)} keywords "
+          f"(master DB: {engine.master.status}, {len(engine.master)} contacts)...")
+
+    results, diag = engine.search(keywords, chunk_files, max_hits=args.max_hits, fuzzy=args.fuzzy,
+                                  progress=lambda done, total, _: print(f"  {done}/{total} files", end='\r'))
+    if args.top: results = {kw: top_k(df, args.top) for kw, df in results.items()}
+    engine.export(results, fmt, out)
+    print(f"{sum(len(df) for df in results.values())} matches for {len(results)}/{len(keywords)} keywords "
+          f"in {diag.wall:.1f}s -> {out}")
+    if diag.capped: print(f"  capped at {args.max_hits}: {', '.join(diag.capped)}")
+    for file, reason in diag.skipped: print(f"  skipped {file}: {reason}")
+    if diagnostics_path:
+        with open(diagnostics_path, 'w', encoding='utf-8') as f:
+            json.dump(diag.as_dict(), f, indent=1)
+    return 1 if diag.skipped else 0
+
+
+if __name__ == '__main__':
+    # Run as the imported module, not __main__: worker tasks must pickle as search_engine._safe_search_chunk
+    import search_engine
+    sys.exit(search_engine.main())
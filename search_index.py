@@ -0,0 +1,391 @@
+"""Persistent inverted index over the Full_Bio column of chunk_*.csv.
+
+Build / refresh (only changed chunks are re-tokenized):
+
+    python search_index.py build [--force]
+    python search_index.py status
+
+As with corpus_store.py, this is the index of the chunk files in place; the
+app's published snapshots (corpus_manager.py) link its files into their own.
+
+The index is a CANDIDATE generator: it narrows a keyword down to the rows that
+can possibly contain it, and the search still confirms every candidate with
+Python re (case-insensitive), the matcher of the linear scan too (see
+CorpusStore.match). Tokens fold case as re does (fold_case), so results are
+identical with or without the index; chunks that are missing from the index or
+stale (mtime / size changed since the last build) are scanned linearly.
+
+Each chunk's postings are stored as flat Arrow arrays (tokens, rows,
+positions and a trigram -> token map, see postings_table) that searches
+memory-map: a worker's lookups copy nothing but the rows they return.
+
+Each build also writes the corpus VOCABULARY (every token with its document
+frequency, plus a trigram -> token map) for fuzzy search: fuzzy.py looks up
+near-miss spellings through the trigrams instead of comparing every token.
+"""
+import argparse
+import glob
+import os
+import pickle
+import re
+import sys
+from array import array
+from collections import namedtuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from corpus_store import (entry_is_fresh, file_stamp, needs_rebuild, read_bios, write_arrow,
+                          save_manifest, load_manifest as _load_manifest)
+
+INDEX_DIR = ".search_index"
+MANIFEST_NAME = "manifest.json"
+VOCAB_NAME = "vocab.pkl"
+INDEX_VERSION = 3
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Letters re.IGNORECASE matches to ASCII ones that str.lower() leaves alone (or, 'İ', splits: 'i' + U+0307)
+CASE_FOLD = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+
+
+def fold_case(text):
+    """Lowercase text as a case-insensitive re match sees it ('İstanbul' -> 'istanbul')."""
+    text = str(text)
+    return (text if text.isascii() else text.translate(CASE_FOLD)).lower()
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens, in order (position = list offset)."""
+    return TOKEN_RE.findall(fold_case(text))
+
+
+def trigrams(token):
+    """Padded character trigrams: 'texas' -> {'$te', 'tex', 'exa', 'xas', 'as$'}."""
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def gram_code(gram):
+    """A trigram (3 ASCII chars) as one int: the postings' trigram map is searched with numpy."""
+    return int.from_bytes(gram.encode('ascii'), 'big')
+
+
+def _index_file(index_dir, chunk_file):
+    return os.path.join(index_dir, os.path.basename(chunk_file) + ".idx")
+
+
+def build_chunk_postings(bios):
+    """token -> {row: (positions...)} for one chunk."""
+    postings = {}
+    for row, bio in bios.items():
+        positions = {}
+        for pos, tok in enumerate(tokenize(bio)):
+            positions.setdefault(tok, []).append(pos)
+        for tok, pos_list in positions.items():
+            postings.setdefault(tok, {})[row] = tuple(pos_list)
+    return postings
+
+
+def postings_table(postings):
+    """One chunk's postings as flat arrays, in a one-row table of list columns (memory-mappable).
+
+    Token t (tokens sorted) has the entries tok_offsets[t]:tok_offsets[t + 1];
+    entry e is a row (rows[e]) and its positions pos_offsets[e]:pos_offsets[e + 1].
+    Trigram g (gram_code, sorted) lists the token ids gram_offsets[g]:gram_offsets[g + 1].
+    """
+    tokens = sorted(postings)
+    tok_offsets, rows, pos_offsets, positions = [0], [], [0], []
+    grams = {}
+    for i, tok in enumerate(tokens):
+        for row, pos_list in sorted(postings[tok].items()):
+            rows.append(row)
+            positions.extend(pos_list)
+            pos_offsets.append(len(positions))
+        tok_offsets.append(len(rows))
+        for gram in trigrams(tok):
+            grams.setdefault(gram_code(gram), []).append(i)
+    gram_keys = sorted(grams)
+    gram_offsets, gram_tokens = [0], []
+    for gram in gram_keys:
+        gram_tokens.extend(grams[gram])
+        gram_offsets.append(len(gram_tokens))
+    columns = {'tokens': (tokens, pa.string()), 'tok_offsets': (tok_offsets, pa.int32()),
+               'rows': (rows, pa.int32()), 'pos_offsets': (pos_offsets, pa.int32()),
+               'positions': (positions, pa.int32()), 'grams': (gram_keys, pa.int32()),
+               'gram_offsets': (gram_offsets, pa.int32()), 'gram_tokens': (gram_tokens, pa.int32())}
+    return pa.table({name: pa.array([values], type=pa.list_(kind)) for name, (values, kind) in columns.items()})
+
+
+def load_manifest(index_dir=INDEX_DIR):
+    return _load_manifest(index_dir, INDEX_VERSION)
+
+
+def build_index(chunk_files=None, index_dir=INDEX_DIR, force=False, log=print):
+    """Incremental build: re-tokenize only chunks whose mtime/size AND hash changed."""
+    if chunk_files is None:
+        chunk_files = sorted(glob.glob("chunk_*.csv"))
+    os.makedirs(index_dir, exist_ok=True)
+    manifest = load_manifest(index_dir)
+    entries = manifest['chunks']
+    stats = {'built': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    for file in chunk_files:
+        key = os.path.basename(file)
+        idx_path = _index_file(index_dir, file)
+        rebuild, sha1 = needs_rebuild(entries.get(key), file, idx_path, force)
+        if not rebuild:
+            stats['unchanged'] += 1
+            continue
+
+        try:
+            mtime_ns, size = file_stamp(file)
+            bios = read_bios(file)
+        except Exception as e:
+            log(f"  ! {key}: {e}")
+            stats['failed'] += 1
+            continue
+
+        postings = build_chunk_postings(bios)
+        write_arrow(postings_table(postings), idx_path)
+        entries[key] = {'mtime_ns': mtime_ns, 'size': size, 'sha1': sha1,
+                        'rows': len(bios), 'tokens': len(postings)}
+        stats['built'] += 1
+        log(f"  + {key}: {len(bios)} rows, {len(postings)} tokens")
+
+    # Drop chunks that no longer exist on disk
+    live = {os.path.basename(f) for f in chunk_files}
+    for key in [k for k in entries if k not in live]:
+        del entries[key]
+        try: os.remove(os.path.join(index_dir, key + ".idx"))
+        except OSError: pass
+        stats['removed'] += 1
+
+    # The vocabulary records which chunks it merged: entries linked in from another index
+    # (corpus_manager) change that set without a build here
+    vocab_path = os.path.join(index_dir, VOCAB_NAME)
+    if stats['built'] or manifest.get('vocab') != sorted(entries) or not os.path.exists(vocab_path):
+        vocab = build_vocabulary(list(entries), index_dir)
+        manifest['vocab'] = sorted(entries)
+        log(f"  vocabulary: {len(vocab['tokens'])} tokens")
+    save_manifest(manifest, index_dir)
+    return stats
+
+
+def build_vocabulary(chunk_keys, index_dir=INDEX_DIR):
+    """Merge the chunks' postings into {'tokens', 'df', 'grams'} and save it next to them."""
+    df = {}
+    for key in chunk_keys:
+        try: chunk = ChunkPostings.open(os.path.join(index_dir, key + ".idx"))
+        except Exception: continue
+        for tok, rows in zip(chunk.tokens.to_pylist(), np.diff(chunk.tok_offsets).tolist()):
+            df[tok] = df.get(tok, 0) + rows
+    tokens = sorted(df)
+    grams = {}
+    for i, tok in enumerate(tokens):
+        if tok.isdigit(): continue  # numbers are never fuzzy-matched
+        for gram in trigrams(tok):
+            grams.setdefault(gram, array('I')).append(i)
+    vocab = {'tokens': tokens, 'df': array('I', (df[t] for t in tokens)), 'grams': grams}
+    path = os.path.join(index_dir, VOCAB_NAME)
+    with open(path + ".tmp", 'wb') as f:
+        pickle.dump(vocab, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+    return vocab
+
+
+# One keyword token: how it sits inside a text token, and the trigrams any such text token has
+TokenStep = namedtuple('TokenStep', ['token', 'anchor_start', 'anchor_end', 'grams'])
+
+
+def _token_step(tok, anchor_start, anchor_end):
+    """Substring semantics: a matching text token has all the keyword token's trigrams (padded
+    on its anchored sides), so the trigram map narrows the vocabulary first."""
+    padded = f"{'$' if anchor_start else ''}{tok}{'$' if anchor_end else ''}"
+    return TokenStep(tok, anchor_start, anchor_end, {padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _step_mask(texts, step):
+    """Which of `texts` (an Arrow string array) the keyword token can sit in."""
+    if step.anchor_start and step.anchor_end: return pc.equal(texts, step.token)
+    if step.anchor_start: return pc.starts_with(texts, step.token)
+    if step.anchor_end: return pc.ends_with(texts, step.token)
+    return pc.match_substring(texts, step.token)
+
+
+def _ranges(starts, ends):
+    """The index ranges starts[i]:ends[i], concatenated."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total: return np.zeros(0, dtype=np.int64)
+    shift = np.repeat(starts.astype(np.int64) - np.cumsum(lengths) + lengths, lengths)
+    return shift + np.arange(total)
+
+
+def keyword_plan(keyword):
+    """Split a keyword into per-token TokenSteps, or None if it has no tokens.
+
+    A text containing the keyword (case-insensitive) always contains these
+    tokens at consecutive positions, so the plan yields a SUPERSET of the true
+    matches: 'San Antonio' -> (*san)(antonio*), 'Texas' -> (*texas*).
+    """
+    kw = fold_case(keyword)
+    toks = tokenize(kw)
+    if not toks: return None
+    lead_sep = not kw[0].isascii() or not kw[0].isalnum()
+    trail_sep = not kw[-1].isascii() or not kw[-1].isalnum()
+    plan = []
+    for i, tok in enumerate(toks):
+        # Inner boundaries of a multi-token keyword are always separators
+        anchor_start = i > 0 or lead_sep
+        anchor_end = i < len(toks) - 1 or trail_sep
+        plan.append(_token_step(tok, anchor_start, anchor_end))
+    return plan
+
+
+class ChunkPostings:
+    """One chunk's memory-mapped postings (see postings_table)."""
+
+    def __init__(self, table):
+        values = {name: table.column(name).chunk(0).values for name in table.column_names}
+        self.tokens = values['tokens']
+        self.tok_offsets, self.rows, self.pos_offsets, self.positions, self.grams, self.gram_offsets, self.gram_tokens = (
+            values[name].to_numpy() for name in
+            ('tok_offsets', 'rows', 'pos_offsets', 'positions', 'grams', 'gram_offsets', 'gram_tokens'))
+
+    @classmethod
+    def open(cls, path):
+        return cls(pa.ipc.open_file(pa.memory_map(path, 'r')).read_all())
+
+    def token_ids(self, step):
+        """Ids of the chunk tokens a TokenStep matches."""
+        if not step.grams:  # < 3 chars: check every token
+            return np.flatnonzero(_step_mask(self.tokens, step).to_numpy(zero_copy_only=False))
+        # Only the tokens under the step's rarest trigram can match
+        codes = np.array([gram_code(gram) for gram in step.grams])
+        found = np.minimum(np.searchsorted(self.grams, codes), len(self.grams) - 1)
+        if not len(self.grams) or (self.grams[found] != codes).any(): return np.zeros(0, dtype=np.int64)
+        sizes = self.gram_offsets[found + 1] - self.gram_offsets[found]
+        rarest = found[np.argmin(sizes)]
+        ids = self.gram_tokens[self.gram_offsets[rarest]:self.gram_offsets[rarest + 1]]
+        return ids[_step_mask(self.tokens.take(ids), step).to_numpy(zero_copy_only=False)]
+
+    def row_ids(self, ids):
+        """Rows holding any of the tokens."""
+        return set(np.unique(self.rows[_ranges(self.tok_offsets[ids], self.tok_offsets[ids + 1])]).tolist())
+
+    def row_positions(self, ids):
+        """(row << 32 | position) of every occurrence of the tokens, sorted."""
+        entries = _ranges(self.tok_offsets[ids], self.tok_offsets[ids + 1])
+        starts, ends = self.pos_offsets[entries], self.pos_offsets[entries + 1]
+        rows = np.repeat(self.rows[entries].astype(np.int64), ends - starts)
+        return np.sort(rows << 32 | self.positions[_ranges(starts, ends)])
+
+
+class SearchIndex:
+    """Read side of the index; per-chunk postings are loaded lazily and cached."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self._manifest_stamp = None
+        self._manifest = {'version': INDEX_VERSION, 'chunks': {}}
+        self._postings = {}  # chunk key -> (idx mtime_ns, ChunkPostings)
+        self._vocab = (None, None)  # (vocab mtime_ns, vocab)
+
+    def _refresh_manifest(self):
+        path = os.path.join(self.index_dir, MANIFEST_NAME)
+        try: stamp = os.stat(path).st_mtime_ns
+        except OSError: stamp = None
+        if stamp != self._manifest_stamp:
+            self._manifest = load_manifest(self.index_dir)
+            self._manifest_stamp = stamp
+            # Let go of the postings of chunks the build removed
+            self._postings = {k: v for k, v in self._postings.items() if k in self._manifest['chunks']}
+
+    def is_fresh(self, chunk_file):
+        self._refresh_manifest()
+        return entry_is_fresh(self._manifest['chunks'].get(os.path.basename(chunk_file)), chunk_file)
+
+    def _chunk_postings(self, chunk_file):
+        key = os.path.basename(chunk_file)
+        idx_path = _index_file(self.index_dir, chunk_file)
+        try: stamp = os.stat(idx_path).st_mtime_ns
+        except OSError: return None
+        cached = self._postings.get(key)
+        if cached and cached[0] == stamp: return cached[1]
+        try: postings = ChunkPostings.open(idx_path)
+        except Exception: return None
+        self._postings[key] = (stamp, postings)
+        return postings
+
+    def vocabulary(self):
+        """The corpus vocabulary from the last build (see build_vocabulary), or None."""
+        path = os.path.join(self.index_dir, VOCAB_NAME)
+        try: stamp = os.stat(path).st_mtime_ns
+        except OSError: return None
+        if self._vocab[0] != stamp:
+            try:
+                with open(path, 'rb') as f:
+                    self._vocab = (stamp, pickle.load(f))
+            except Exception:
+                return None
+        return self._vocab[1]
+
+    def keyword_rows(self, chunk_file, keyword):
+        """Candidate rows for ONE keyword, or None if the index can't answer."""
+        if not self.is_fresh(chunk_file): return None
+        plan = keyword_plan(keyword)
+        if plan is None: return None
+        postings = self._chunk_postings(chunk_file)
+        if postings is None: return None
+
+        steps = [postings.token_ids(step) for step in plan]
+        if any(not len(ids) for ids in steps): return set()
+        if len(steps) == 1: return postings.row_ids(steps[0])
+
+        # Positional check: tokens must be consecutive (phrases like "San Antonio")
+        starts = postings.row_positions(steps[0])
+        for offset, ids in enumerate(steps[1:], start=1):
+            starts = starts[np.isin(starts + offset, postings.row_positions(ids))]
+            if not len(starts): return set()
+        return set(np.unique(starts >> 32).tolist())
+
+    def keyword_candidates(self, chunk_file, keywords):
+        """{keyword: candidate rows, or None where the index can't answer}; None if the chunk isn't indexed."""
+        if not self.is_fresh(chunk_file) or self._chunk_postings(chunk_file) is None: return None
+        return {kw: self.keyword_rows(chunk_file, kw) for kw in keywords}
+
+    def candidate_rows(self, chunk_file, keywords):
+        """Union of candidates over keywords; None means scan the chunk linearly."""
+        return union_candidates(self.keyword_candidates(chunk_file, keywords))
+
+
+def union_candidates(rows_by_kw):
+    """All keywords' candidate rows, or None if some keyword (or the whole chunk) can't be answered."""
+    if rows_by_kw is None or any(rows is None for rows in rows_by_kw.values()): return None
+    return set().union(*rows_by_kw.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Full_Bio inverted index for chunk_*.csv")
+    parser.add_argument('command', choices=['build', 'status'])
+    parser.add_argument('--index-dir', default=INDEX_DIR)
+    parser.add_argument('--force', action='store_true', help="re-tokenize every chunk")
+    args = parser.parse_args(argv)
+
+    chunk_files = sorted(glob.glob("chunk_*.csv"))
+    if args.command == 'build':
+        stats = build_index(chunk_files, args.index_dir, force=args.force)
+        print(f"Index: {stats['built']} built, {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['failed']} failed")
+        return 1 if stats['failed'] else 0
+
+    index = SearchIndex(args.index_dir)
+    stale = [f for f in chunk_files if not index.is_fresh(f)]
+    print(f"{len(chunk_files) - len(stale)}/{len(chunk_files)} chunks indexed and fresh")
+    for f in stale: print(f"  stale: {f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""The bio rules over the checked-in chunk_74.csv: compiled vs list scans, and pinned decisions."""
+import os
+
+from bio_parser import classify_batch, parse_header_v1_26, split_header_v1_26, verify_rules
+from corpus_store import read_bios
+
+CHUNK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chunk_74.csv")
+
+# Per row: ('REJECT', header reject rule) or (Role, the rule that decided it: role rule or 'junk:...')
+EXPECTED = [
+    ('PLAYER', 'default'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('COACH/STAFF', 'coach:coach'), ('PLAYER', 'default'),
+    ('COACH/STAFF', 'coach:coach'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('COACH/STAFF', 'staff:coordinator'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('PLAYER', 'default'), ('COACH/STAFF', 'coach:coach'),
+    ('PLAYER', 'default'), ('COACH/STAFF', 'staff:director'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('PLAYER', 'default'), ('PLAYER', 'default'),
+    ('PLAYER', 'default'), ('REJECT', 'name_fragment:played'), ('COACH/STAFF', 'staff:director'),
+    ('PLAYER', 'default'),
+]
+
+
+def test_compiled_rules_match_list_scans():
+    assert verify_rules(read_bios(CHUNK), log=lambda *_: None) == 0
+
+
+def test_header_decisions_are_pinned():
+    bios = read_bios(CHUNK)
+    raw = [split_header_v1_26(bio) for bio in bios]
+    rejects = classify_batch([(r['Name'] or "", r['Title'], r['School']) for r in raw])['reject']
+    metas = [parse_header_v1_26(bio) for bio in bios]
+    parsed = iter(classify_batch([(m['Name'] or "Unknown", m['Title'], m['School']) for m in metas if m])
+                  .itertuples(index=False))
+    decisions = []
+    for meta, reject in zip(metas, rejects):
+        if meta is None:
+            decisions.append(('REJECT', reject))
+            continue
+        row = next(parsed)
+        assert row.role == meta['Role']  # batch and per-row agree
+        decisions.append((meta['Role'], row.role_rule if row.junk is None else f"junk:{row.junk}"))
+    assert decisions == EXPECTED
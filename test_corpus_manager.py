@@ -0,0 +1,37 @@
+"""Snapshots reuse the data directory's own store / index builds and take their files along when collected."""
+import glob
+import os
+import shutil
+
+from corpus_manager import CorpusManager
+from corpus_store import STORE_DIR, build_store
+from search_index import INDEX_DIR, build_index
+
+CHUNK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chunk_74.csv")
+
+
+def _quiet(*_):
+    pass
+
+
+def test_publish_links_the_existing_builds_and_collect_prunes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in (1, 2): shutil.copy(CHUNK, f"chunk_0{i}.csv")
+    build_store(log=_quiet)
+    build_index(log=_quiet)
+
+    manager = CorpusManager(".", raw_dir=None)
+    manager.refresh(settle=False)
+    first = [os.path.basename(f) for f in manager.current().chunk_files]
+    for name, copy in zip(["chunk_01.csv", "chunk_02.csv"], first):
+        for build_dir, suffix in [(STORE_DIR, ".arrow"), (STORE_DIR, ".meta.arrow"), (INDEX_DIR, ".idx")]:
+            assert os.path.samefile(os.path.join(build_dir, name + suffix),
+                                    os.path.join(".corpus_snapshot", build_dir, copy + suffix))
+
+    with open("chunk_02.csv", 'a', encoding='utf-8') as f: f.write("\n")
+    assert manager.refresh(settle=False) == 'updated'  # the old snapshot is no longer referenced
+    live = {os.path.basename(f) for f in manager.current().chunk_files}
+    assert first[1] not in live
+    left = {os.path.basename(p).partition(".csv")[0] + ".csv"
+            for p in glob.glob(".corpus_snapshot/**/chunk_*", recursive=True)}
+    assert left == live
@@ -0,0 +1,61 @@
+"""Fuzzy variants and how their results fold back under the typed keyword."""
+import re
+from array import array
+
+import pandas as pd
+
+from bio_parser import Phrase, keyword_regex
+from fuzzy import Vocabulary, fold_results, fuzzy_variants, token_options
+from search_index import trigrams
+
+
+def vocabulary(df_by_token):
+    """A Vocabulary as search_index.build_vocabulary lays it out."""
+    tokens = sorted(df_by_token)
+    grams = {}
+    for i, tok in enumerate(tokens):
+        for gram in trigrams(tok): grams.setdefault(gram, array('I')).append(i)
+    return Vocabulary({'tokens': tokens, 'df': array('I', (df_by_token[t] for t in tokens)), 'grams': grams})
+
+
+def test_adjacent_swaps_are_one_edit():
+    vocab = vocabulary({'houston': 20, 'hudson': 3})
+    for typo in ["hosuton", "houtson", "housotn", "houstn"]:
+        assert vocab.similar(typo, 1)[0][0] == "houston", typo
+
+
+def test_rare_corpus_tokens_are_corrected_toward_common_ones():
+    vocab = vocabulary({'tallahasee': 2, 'tallahassee': 40, 'texas': 37, 'texan': 3})
+    assert "tallahassee" in [t for t, _ in token_options("tallahasee", vocab)]
+    assert [t for t, _ in token_options("texas", vocab)] == ["texas"]
+    assert "texas" in [t for t, _ in token_options("texan", vocab)]  # 37 >= 10 x 3
+
+
+def test_multi_word_variants_match_across_punctuation():
+    variants = dict(fuzzy_variants("Saint Louis"))
+    assert isinstance(next(v for v in variants if v == "st louis"), Phrase)
+    for phrase, text in [("st louis", "born in St. Louis, MO"), ("miami fl", "Miami (FL)"),
+                         ("texas a m", "Texas A&M Aggies")]:
+        assert re.search(keyword_regex(Phrase(phrase)), text, re.IGNORECASE), phrase
+    assert keyword_regex("St. Louis") == re.escape("St. Louis")  # typed keywords stay literal
+
+
+def _frame(*rows):
+    return pd.DataFrame([{'Role': "PLAYER", 'Name': name, 'Title': "Football", 'School': school, 'Email': "",
+                          'Twitter': "", 'Context': "", 'Chunk': chunk, 'Row': row, 'Relevance': 1.0}
+                         for name, school, chunk, row in rows])
+
+
+def test_fold_keeps_best_variant_and_file_order():
+    results = {
+        'Houstn': _frame(("Ann Lee", "Rice", "chunk_02.csv", 4)),
+        'houston': _frame(("Bo Diaz", "Rice", "chunk_01.csv", 9), ("Ann Lee", "Rice", "chunk_02.csv", 7),
+                          ("Cy Ray", "Navy", "chunk_02.csv", 1)),
+    }
+    plan = {'Houstn': [("Houstn", 1.0), ("houston", 0.86)]}
+    folded = fold_results(results, plan)['Houstn']
+    assert folded['Name'].tolist() == ["Ann Lee", "Cy Ray", "Bo Diaz"]  # best similarity first
+    assert folded.loc[folded['Name'] == "Ann Lee", 'Match'].item() == "Houstn"
+    # The index is file order (Chunk, Row): what top_k ties and cap_frame read
+    assert folded.sort_index()['Name'].tolist() == ["Bo Diaz", "Cy Ray", "Ann Lee"]
+    assert len(fold_results(results, plan, max_hits=2)['Houstn']) == 2
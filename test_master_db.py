@@ -0,0 +1,116 @@
+"""MasterSource against a local HTTP stand-in for the sheet; MasterLookup join precedence."""
+import http.server
+import io
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from bio_parser import normalize_text_v1_26
+from master_db import MasterLookup, MasterSource, build_records
+
+SHEET = (b"School,First Name,Last Name,Email,Individual Twitter,Title\n"
+         b"Jacksonville State,Xavier,Garcia,xg@jsu.edu,@xg,Coach\n"
+         b"Alabama State,Chris,Barnette,cb@asu.edu,x,OC\n")
+ETAG = '"v1"'
+
+
+class SheetHandler(http.server.BaseHTTPRequestHandler):
+    gate = None  # a threading.Event the response waits for, if set
+    seen = []  # If-None-Match of each request
+
+    def do_GET(self):
+        if self.gate is not None: self.gate.wait(10)
+        self.seen.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(SHEET)))
+        self.end_headers()
+        self.wfile.write(SHEET)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def sheet(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # no stray *master*.csv fallback
+    SheetHandler.gate, SheetHandler.seen = None, []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SheetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    if SheetHandler.gate is not None: SheetHandler.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/sheet.csv"
+
+
+def test_refresh_updates_then_revalidates(sheet, tmp_path):
+    source = MasterSource(_url(sheet), snapshot_dir=str(tmp_path / "snap"), timeout=5)
+    assert source.refresh() == 'updated'
+    assert len(source.current()) == 2 and source.version == 1
+    assert (tmp_path / "snap" / "snapshot.json").exists() and (tmp_path / "snap" / "master-v1.arrow").exists()
+
+    assert source.refresh() == 'not-modified'
+    assert SheetHandler.seen == [None, ETAG]
+    assert source.version == 1
+
+
+def test_snapshot_served_while_sheet_is_down(sheet, tmp_path):
+    url = _url(sheet)
+    assert MasterSource(url, snapshot_dir=str(tmp_path / "snap")).refresh() == 'updated'
+    sheet.shutdown()
+    sheet.server_close()
+
+    source = MasterSource(url, snapshot_dir=str(tmp_path / "snap"), timeout=1).start(background=False)
+    assert source.last_refresh[1] == 'failed'
+    assert source.current().status == "Success" and len(source.current()) == 2
+
+
+def test_start_does_not_wait_for_the_sheet(sheet, tmp_path):
+    SheetHandler.gate = threading.Event()
+    source = MasterSource(_url(sheet), snapshot_dir=str(tmp_path / "snap"), timeout=5)
+    source.start()
+    assert source.current().status == "Pending" and source.last_refresh is None
+
+    SheetHandler.gate.set()
+    deadline = time.time() + 5
+    while source.last_refresh is None and time.time() < deadline: time.sleep(0.02)
+    source.stop()
+    assert source.last_refresh[1] == 'updated' and len(source.current()) == 2
+
+
+def _hits(*rows):
+    """Hits as search_engine passes them: bio_metadata columns for (School, Name, Role)."""
+    metas = [{'Name': name, 'Title': "Football", 'School': school, 'Role': role,
+              's_key': normalize_text_v1_26(school), 'n_key': normalize_text_v1_26(name),
+              'l_key': normalize_text_v1_26(name.split(' ')[-1])} for school, name, role in rows]
+    return pd.DataFrame(metas)
+
+
+def test_contact_join_precedence():
+    lookup = MasterLookup(build_records(pd.read_csv(io.BytesIO(
+        b"School,First Name,Last Name,Email,Individual Twitter,Title\n"
+        b"Baylor,Dave,Aranda,da@baylor.edu,@da,Head Coach\n"
+        b"Tulane,Dave,Aranda,dave@tulane.edu,,Analyst\n"
+        b"Rice,Mike,Bloomgren,mb@rice.edu,,Head Coach\n"))))
+    out = lookup.match(_hits(
+        ("Tulane", "Dave Aranda", 'COACH/STAFF'),      # school + name beats the name's first row
+        ("Houston", "Dave Aranda", 'COACH/STAFF'),  # name only: its first row
+        ("Houston", "Dave Aranda", 'PLAYER'),       # players only take exact matches
+        ("Rice", "Jim Bloomgren", 'COACH/STAFF'),   # school + last name
+        ("Rice", "Mike Bloomgren", 'PLAYER'),       # exact: a player with contact data is staff
+        ("Navy", "Jo Smith", 'PLAYER'),
+    ))
+    assert out['Match_Source'].tolist() == ['exact', 'global', '', 'fuzzy', 'exact', '']
+    assert out['Email'].tolist() == ["dave@tulane.edu", "da@baylor.edu", "", "mb@rice.edu", "mb@rice.edu", ""]
+    assert out['Role'].tolist() == ['COACH/STAFF', 'COACH/STAFF', 'PLAYER', 'COACH/STAFF', 'COACH/STAFF', 'PLAYER']
+    assert out['Title'].tolist()[:2] == ["Analyst", "Head Coach"]
@@ -0,0 +1,28 @@
+"""Exports as the app hands them to st.download_button."""
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from result_export import EXPORT_FORMATS, export_file
+
+RESULTS = {
+    'Texas': pd.DataFrame({'Role': ["Coach"], 'Name': ["Jane Doe"], 'Title': ["Head Coach"], 'School': ["Baylor"],
+                           'Email': [""], 'Twitter': [""], 'Context': ["...Texas..."],
+                           'Chunk': ["chunk_01.csv"], 'Row': [0], 'Relevance': [1.0]}),
+}
+
+
+def hydrate(df):
+    return df.drop(columns=['Chunk', 'Row', 'Relevance']).assign(Full_Bio="Born in Texas.")
+
+
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+def test_export_file_is_downloadable(fmt):
+    data, _ = convert_data_to_bytes_and_infer_mime(export_file(RESULTS, fmt, hydrate), RuntimeError("unsupported type"))
+    assert data
+    if fmt == 'csv': assert b"Jane Doe" in data
+    if fmt == 'zip': assert zipfile.ZipFile(io.BytesIO(data)).namelist()
+    if fmt == 'xlsx': assert data[:2] == b"PK"
@@ -0,0 +1,55 @@
+"""Headless searches over copies of chunk_74.csv (no master sheet: contact columns stay empty)."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from master_db import MasterSource
+from search_engine import ResultCache, SearchEngine, cap_frame
+
+CHUNK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chunk_74.csv")
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for i in (1, 2): shutil.copy(CHUNK, tmp_path / f"chunk_0{i}.csv")
+    master = MasterSource("http://127.0.0.1:9/", snapshot_dir=str(tmp_path / "snap"))
+    return SearchEngine(master.start(background=False, refresh=False))
+
+
+def test_repeat_search_is_served_from_cache(engine):
+    first, diag = engine.search(["Texas", "coach", "zzzq"])
+    assert diag.searched == ["Texas", "coach", "zzzq"] and "zzzq" not in first
+
+    again, diag = engine.search(["texas", "Coach", "zzzq"])
+    assert diag.searched == []
+    pd.testing.assert_frame_equal(again['texas'], first['Texas'])
+    assert "zzzq" not in again  # "no hits" is cached too
+
+    with open("chunk_02.csv", 'a', encoding='utf-8') as f: f.write("\n")
+    _, diag = engine.search(["Texas"])
+    assert diag.searched == ["Texas"]  # a new corpus version misses
+
+
+def test_cache_evicts_least_recently_used():
+    frame = pd.DataFrame({'Context': ["x" * 1000] * 300})  # ~0.3 MB
+    cache = ResultCache(max_mb=1)
+    for key in "abc": cache.put(key, frame)
+    cache.get("a")
+    cache.put("d", frame)
+    assert cache.get("b") == (False, None)
+    assert all(cache.get(key)[0] for key in "acd")
+    assert cache.bytes <= cache.max_bytes
+
+
+def test_hit_cap_keeps_the_first_rows_in_file_order(engine):
+    full, _ = engine.search(["coach", "Texas"])
+    engine.cache.clear()
+    capped, diag = engine.search(["coach", "Texas"], max_hits=3)
+    assert sorted(diag.capped) == ["Texas", "coach"]
+    for kw in full:
+        assert len(capped[kw]) == 3
+        assert sorted(capped[kw].index) == sorted(full[kw].index)[:3]
+        pd.testing.assert_frame_equal(capped[kw], cap_frame(full[kw], 3))
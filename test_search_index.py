@@ -0,0 +1,61 @@
+"""The index is a candidate generator: never fewer rows than the substring scan finds."""
+import os
+import re
+import shutil
+
+import pandas as pd
+import pytest
+
+from corpus_store import CorpusStore, build_store, read_bios
+from search_index import SearchIndex, build_index, tokenize
+
+CHUNK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chunk_74.csv")
+PHRASES = ["Texas", "San Antonio", "high school", "St. Louis", "A&M", "a", "tx", "of the", "2019", " coach ",
+           "-", "Houston, Texas", "zzzq"]
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    chunk = str(tmp_path / "chunk_01.csv")
+    shutil.copy(CHUNK, chunk)
+    index_dir = str(tmp_path / ".search_index")
+    build_index([chunk], index_dir, log=lambda *_: None)
+    return chunk, SearchIndex(index_dir)
+
+
+def test_candidates_are_a_superset(indexed):
+    chunk, index = indexed
+    bios = read_bios(chunk)
+    words = sorted({tok for bio in bios[:5] for tok in tokenize(bio)})
+    keywords = PHRASES + words[::7] + [w[1:-1] for w in words[::11] if len(w) > 4]
+    for kw in keywords:
+        found = set(bios.index[bios.str.contains(re.escape(kw), case=False, regex=True)])
+        rows = index.keyword_rows(chunk, kw)
+        if rows is None: continue  # no tokens ('-'): the chunk is scanned instead
+        assert found <= rows, kw
+
+
+def test_changed_chunk_is_not_answered(indexed):
+    chunk, index = indexed
+    assert index.keyword_rows(chunk, "Texas")
+    with open(chunk, 'a', encoding='utf-8') as f: f.write("\n")
+    assert index.keyword_rows(chunk, "Texas") is None
+    assert index.candidate_rows(chunk, ["Texas", "coach"]) is None
+
+
+def test_case_folding_follows_python_re(tmp_path):
+    """re.IGNORECASE takes 'İ' and 'ı' for 'i' (RE2 does not) and 'ſ' for 's'; store and index agree with it."""
+    chunk = str(tmp_path / "chunk_01.csv")
+    pd.DataFrame({'Full_Bio': ["Born in İSTANBUL", "ıstanbul native", "Istanbul, Turkey", "Kanſas City", "Kansas",
+                               "no match here"]}).to_csv(chunk, index=False)
+    store_dir, index_dir = str(tmp_path / ".corpus_store"), str(tmp_path / ".search_index")
+    build_store([chunk], store_dir, log=lambda *_: None)
+    build_index([chunk], index_dir, log=lambda *_: None)
+    store, index = CorpusStore(store_dir), SearchIndex(index_dir)
+    bios = read_bios(chunk)
+    for kw in ["istanbul", "İstanbul", "in İstanbul", "kansas", "KANSAS CITY", "Turkey"]:
+        expected = [row for row, bio in bios.items() if re.search(re.escape(kw), bio, re.IGNORECASE)]
+        assert expected, kw
+        assert store.match(store.load(chunk), re.escape(kw)).index.tolist() == expected, kw
+        assert store.match(bios, re.escape(kw)).index.tolist() == expected, kw
+        assert set(expected) <= index.keyword_rows(chunk, kw), kw